@@ -0,0 +1,165 @@
+#!/usr/bin/python
+
+#
+#       accessors.py
+#
+#       Time a typical export that asks each person for ten fields, with the
+#       accessors using Element.children_with_tag() against the same fields
+#       found by looking through all the children for each field.
+#
+#       python benchmarks/accessors.py [people (default 1000000)] [file.ged]
+#
+#       Without a file, a made up file with the given number of people is written to a temp file.
+#
+
+from    __future__  import  print_function
+import  os
+import  random
+import  sys
+import  tempfile
+import  time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import  gedcom
+
+
+FIELDS  = [ "NAME", "SEX", "BIRT", "DEAT", "BURI", "OCCU", "_UID", "AFN", "RIN", "FAMS", ]
+
+
+def write_gedcom(path, people, seed=1):
+    """ Write a made up GEDCOM file with the given number of people in it. """
+    r   = random.Random(seed)
+    out = open(path, 'w')
+    w   = out.write
+    w('0 HEAD\n1 SOUR benchmark\n1 GEDC\n2 VERS 5.5\n1 CHAR UTF-8\n')
+    for i in range(1, people + 1):
+        w('0 @I%d@ INDI\n1 NAME John /Smith%d/\n2 GIVN John\n2 SURN Smith%d\n' % ( i, i % 997, i % 997, ))
+        w('1 SEX %s\n1 BIRT\n2 DATE %d JAN %d\n2 PLAC Town %d\n2 SOUR @S1@\n' % ( r.choice('MF'), r.randint(1, 28), r.randint(1600, 1950), r.randint(1, 50), ))
+        if  r.random() < 0.6:
+            w('1 DEAT\n2 DATE ABT %d\n2 PLAC Town %d\n' % ( r.randint(1650, 2000), r.randint(1, 50), ))
+        if  r.random() < 0.2:
+            w('1 BURI\n2 DATE %d\n2 PLAC Cemetery\n' % r.randint(1650, 2000))
+        if  r.random() < 0.3:
+            w('1 OCCU Farmer\n')
+        for n in range(r.randint(0, 6)):
+            w('1 RESI\n2 DATE %d\n2 PLAC Town %d\n' % ( r.randint(1650, 2000), r.randint(1, 50), ))
+        for n in range(r.randint(0, 12)):
+            w('1 SOUR @S%d@\n2 PAGE %d\n' % ( r.randint(1, 100), r.randint(1, 500), ))
+        if  r.random() < 0.3:
+            w('1 OBJE @O%d@\n' % i)
+        w('1 FAMC @F%d@\n1 FAMS @F%d@\n1 _UID %08X\n1 CHAN\n2 DATE 1 JAN 2017\n' % ( r.randint(1, people // 3 + 1), (i + 2) // 3, r.getrandbits(32), ))
+    w('0 TRLR\n')
+    out.close()
+
+
+def indexed_export(people):
+    """ The export, using the accessors. """
+    for e in people:
+        yield ( e.name(), e.gender(), e.birth(), e.death(), e.burial(), e.occupation(), e.get_string_value("_UID"), e.afn(), e.mh_rin(), e.get_values_list("FAMS"), )
+    pass
+
+
+def scan_event(e, tag):
+    date    = ""
+    place   = ""
+    source  = ()
+    for c in e.children():
+        if  c.tag() == tag:
+            for d in c.children():
+                if  d.tag() == "DATE":
+                    date    = d.value()
+                if  d.tag() == "PLAC":
+                    place   = d.value()
+                if  d.tag() == "SOUR":
+                    source  = source + ( d.value(), )
+            pass
+        pass
+    return ( date, place, source, )
+
+
+def scan_string(e, tag):
+    for c in e.children():
+        if  c.tag() == tag:
+            return c.value()
+        pass
+    return ""
+
+
+def scan_name(e):
+    first   = ""
+    last    = ""
+    for c in e.children():
+        if  c.tag() == "NAME":
+            for n in c.children():
+                if  n.tag() == "GIVN":
+                    first   = n.value().strip()
+                if  n.tag() == "SURN":
+                    last    = n.value().strip()
+            if  (not first) and (not last) and c.value().strip():
+                name    = c.value().split('/')
+                first   = name[0].strip()
+                if  len(name) > 1:
+                    last    = name[1].strip()
+                pass
+            pass
+        pass
+    return ( first, last, )
+
+
+def scan_export(people):
+    """ The same export, looking through all of a person's children for each field. """
+    for e in people:
+        occupation  = [ c.value().strip() for c in e.children() if c.tag() == "OCCU" ]
+        yield ( scan_name(e), scan_string(e, "SEX").strip(), scan_event(e, "BIRT"), scan_event(e, "DEAT"), scan_event(e, "BURI"), (occupation or [ "" ])[-1],
+                scan_string(e, "_UID"), scan_string(e, "AFN"), scan_string(e, "RIN"), [ c.value() for c in e.children() if c.tag() == "FAMS" ], )
+    pass
+
+
+def time_export(export, people):
+    """ Return how long the export takes. The rows aren't kept, so they don't make the garbage collector work harder for one export than the other. """
+    start   = time.time()
+    for row in export(people):
+        pass
+    return time.time() - start
+
+
+def main():
+    people      = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    path        = sys.argv[2] if len(sys.argv) > 2 else None
+    temp_path   = None
+    if  not path:
+        fd, temp_path   = tempfile.mkstemp(suffix = '.ged')
+        os.close(fd)
+        path    = temp_path
+        print("writing %d people to %s" % ( people, path, ))
+        write_gedcom(path, people)
+    try:
+        start   = time.time()
+        g       = gedcom.Gedcom(path)
+        print("parsed in %.2f seconds" % ( time.time() - start, ))
+        people  = [ e for e in g.element_list() if e.level() == 0 and e.is_individual() ]
+        scan_seconds    = time_export(scan_export, people)
+        first_seconds   = time_export(indexed_export, people)
+        again_seconds   = time_export(indexed_export, people)
+        for row, scan_row in zip(indexed_export(people), scan_export(people)):
+            if  row != scan_row:
+                raise AssertionError("the exports differ: %s %s" % ( row, scan_row, ))
+            pass
+        print("%d people, %d fields each" % ( len(people), len(FIELDS), ))
+        print("    scanning children:          %7.2f seconds" % scan_seconds)
+        print("    tag index (building it):    %7.2f seconds  %5.2fx" % ( first_seconds, scan_seconds / max(first_seconds, 1e-9), ))
+        print("    tag index (already built):  %7.2f seconds  %5.2fx" % ( again_seconds, scan_seconds / max(again_seconds, 1e-9), ))
+    finally:
+        if  temp_path:
+            os.remove(temp_path)
+        pass
+    pass
+
+
+if  __name__ == '__main__':
+    main()
+
+
+#
+# eof
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+#
+#       dates.py
+#
+#       Check a_date.parse_tokens() against the regex cascade, a_date.parse_cascade(), on a corpus of date
+#       strings, and time the two with nothing cached.
+#
+#       python benchmarks/dates.py [file.ged ...]
+#
+#       The corpus is the DATE values of the files given, or, without files, the date strings below, each with the usual qualifiers in front of it.
+#       The strings below are mostly odd ones, which parse_tokens() leaves to the cascade, and almost every one of
+#       them has a template (its digits changed to 0s) of its own, so date_templates is no help. On them, trying
+#       parse_tokens() first is expected to be slower than the cascade alone. It's quicker on real files, whose
+#       dates have a few templates between them.
+#
+
+from    __future__  import  print_function
+import  io
+import  os
+import  re
+import  sys
+import  time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import  gedcom
+
+
+DATES       = [
+                "12 JAN 1850", "1 Jan 1850", "01 JAN 1850", "31 DEC 1999", "29 FEB 1851", "29 FEB 1852", "31 FEB 1850", "32 JAN 1850", "00 JAN 1850",
+                "JAN 1850", "Jan. 1850", "January 1850", "January, 1850", "Sept 1799", "Sept. 12, 1799", "September 12 1799", "Dec 25, 2001", "Jan, 12, 1850",
+                "1850", "0850", "850", "2029", "2030", "18500", "1850.", "(1850)", "1850?",
+                "12JAN1850", "1May1674 (age 71)", "17 Jun 1790 age 38", "12 janv 1850", "12 janvier 1850", "12 Mai 1850", "12 okt 1850", "3 Dez 1850",
+                "12 febuary 1850", "12 Fevrier 1850", "12 février 1850", "1 août 1850", "5 marzo 1850", "5 maggio 1850", "12 maybe 1850",
+                "1888-04-03", "3/4/1888", "04/03/1888", "4.3.1888", "4-3-1888", "18880403", "04031888", "188804", "041888", "1888-04-00", "00001888",
+                "BET 1800 AND 1810", "FROM 1800 TO 1810", "Bet. 04 Jul-18 Sep 1731", "Betw 17 Sept 1683 & 29 June 1685", "1661/1754", "1741-9 April 1743",
+                "CAL 1750", "INT 1750 (about then)", "by 1850", "by census 1850", "as of 1850", "(1850-1851)", "About:1860-00-00",
+                "12 JAN", "JAN 12", "Jan", "Y", "deceased", "died 1900", "", " ", "?",
+              ]
+QUALIFIERS  = [ "", "ABT ", "Abt. ", "about ", "EST ", "est. ", "c. ", "ca ", "cir. ", "circa ", "BEF ", "bef. ", "before ", "AFT ", "aft. ", "after ", "since ", "abt bef ", ]
+
+
+def corpus(paths):
+    """ Return the date strings to check, each once. """
+    dates   = set()
+    if  not paths:
+        dates   = set([ qualifier + date for date in DATES for qualifier in QUALIFIERS ])
+    for path in paths:
+        with io.open(path, encoding = 'utf8', errors = 'replace') as f:
+            for line in f:
+                g   = re.match(r'\s*\d+\s+DATE\s(.*)', line.rstrip('\r\n'))
+                if  g:
+                    dates.add(g.group(1))
+                pass
+            pass
+        pass
+    return sorted(dates)
+
+
+def as_tuple(date):
+    return date and date.to_tuple()
+
+
+def time_parse(parse, dates, times = 3):
+    """ Return how many microseconds it takes parse() to do a date, the best of times tries, each starting with nothing remembered. """
+    best    = None
+    for i in range(times):
+        gedcom.month_matcher.memo.clear()
+        gedcom.date_templates.clear()
+        start   = time.time()
+        for d in dates:
+            parse(d)
+        seconds = time.time() - start
+        best    = seconds if best is None else min(best, seconds)
+    return best * 1e6 / max(len(dates), 1)
+
+
+def main():
+    dates       = corpus(sys.argv[1:])
+    normalized  = [ gedcom.best_ascii(d.strip().lower()) for d in dates ]           # as a_date.parse() does before either of them
+    tokens      = 0
+    for d, n in zip(dates, normalized):
+        expected    = as_tuple(gedcom.a_date.parse_cascade(n))
+        date        = gedcom.a_date.parse_tokens(n)
+        if  date is not None:
+            tokens += 1
+            if  as_tuple(date) != expected:
+                raise AssertionError("%r: parse_tokens() gives %s, the cascade %s" % ( d, as_tuple(date), expected, ))
+            pass
+        pass
+    cascade_us  = time_parse(gedcom.a_date.parse_cascade, normalized)
+    tokens_us   = time_parse(lambda d : gedcom.a_date.parse_tokens(d) or gedcom.a_date.parse_cascade(d), normalized)
+    print("%d date strings, %d of them read by parse_tokens(), all the same as the cascade" % ( len(dates), tokens, ))
+    print("    cascade:                    %7.2f microseconds a date" % cascade_us)
+    print("    tokens, then the cascade:   %7.2f microseconds a date  %5.2fx" % ( tokens_us, cascade_us / max(tokens_us, 1e-9), ))
+    if  not sys.argv[1:]:
+        print("    (the built in strings are mostly odd, one of a kind ones, which are expected to be slower with tokens first - give .ged files for real dates)")
+
+
+if  __name__ == '__main__':
+    main()
+
+
+#
+# eof
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+
+#
+#       lazy.py
+#
+#       Check that Gedcom(storage="lazy") parses only the records get_parents() needs - the person,
+#       the person's FAMC families and the parents - and time it against opening the whole file.
+#
+#       python benchmarks/lazy.py [families (default 50000)]
+#
+#       A made up file with the given number of families, each with two parents and two children, is written to a temp file.
+#
+
+from    __future__  import  print_function
+import  os
+import  sys
+import  tempfile
+import  time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import  gedcom
+
+
+def write_gedcom(path, families):
+    """ Write a made up GEDCOM file: family i has parents @I<4i+1>@ and @I<4i+2>@ and children @I<4i+3>@ and @I<4i+4>@, and the parents are the children of family i - 1. """
+    out = open(path, 'w')
+    w   = out.write
+    w('0 HEAD\n1 SOUR benchmark\n1 GEDC\n2 VERS 5.5\n1 CHAR UTF-8\n')
+    for f in range(families):
+        for n in range(1, 5):
+            i   = 4 * f + n
+            w('0 @I%d@ INDI\n1 NAME John /Smith%d/\n1 SEX %s\n1 BIRT\n2 DATE %d\n' % ( i, f, 'MF'[n & 1], 1600 + f % 300, ))
+            if  n <= 2:
+                w('1 FAMS @F%d@\n' % f)
+                if  f:
+                    w('1 FAMC @F%d@\n' % (f - 1))
+                pass
+            else:
+                w('1 FAMC @F%d@\n' % f)
+            pass
+        w('0 @F%d@ FAM\n1 HUSB @I%d@\n1 WIFE @I%d@\n1 CHIL @I%d@\n1 CHIL @I%d@\n' % ( f, 4 * f + 1, 4 * f + 2, 4 * f + 3, 4 * f + 4, ))
+    w('0 TRLR\n')
+    out.close()
+
+
+def main():
+    families    = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    fd, path    = tempfile.mkstemp(suffix = '.ged')
+    os.close(fd)
+    try:
+        write_gedcom(path, families)
+        f       = families // 2
+        pointer = '@I%d@' % (4 * f + 3)
+        start   = time.time()
+        g       = gedcom.Gedcom(path, storage = "lazy")
+        parents = g.get_parents(g.get_element(pointer))
+        lazy_seconds    = time.time() - start
+        records = g.record_index()
+        parsed  = set(records.parsed())
+        wanted  = set(records.pointers[p] for p in ( pointer, '@F%d@' % f, '@I%d@' % (4 * f + 1), '@I%d@' % (4 * f + 2), ))
+        if  [ e.pointer() for e in parents ] != [ '@I%d@' % (4 * f + 1), '@I%d@' % (4 * f + 2), ]:
+            raise AssertionError("get_parents() gives %s" % [ e.pointer() for e in parents ])
+        if  parsed != wanted:
+            raise AssertionError("get_parents() parsed %d records, not just the %d it needs" % ( len(parsed), len(wanted), ))
+        start   = time.time()
+        g       = gedcom.Gedcom(path)
+        g.get_parents(g.get_element(pointer))
+        whole_seconds   = time.time() - start
+        print("%d records, %d of them parsed by a lazy get_parents()" % ( len(records), len(parsed), ))
+        print("    open and get_parents(), lazy:           %7.2f seconds" % lazy_seconds)
+        print("    open and get_parents(), whole file:     %7.2f seconds" % whole_seconds)
+    finally:
+        os.remove(path)
+    pass
+
+
+if  __name__ == '__main__':
+    main()
+
+
+#
+# eof
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+
+#
+#       memory.py
+#
+#       Print how many bytes each element of a parsed file takes, with Element as it is and with
+#       an element like Element was before it had __slots__ (its fields in a __dict__, a list
+#       of children each and nothing interned).
+#
+#       python3 benchmarks/memory.py [people (default 30000)] [file.ged]
+#
+#       Without a file, a made up file with the given number of people is written to a temp file, as accessors.py does.
+#       tracemalloc needs python3.
+#
+
+from    __future__  import  print_function
+import  gc
+import  os
+import  sys
+import  tempfile
+import  tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import  gedcom
+
+from    accessors   import  write_gedcom
+
+
+class   DictElement(object):
+    """ The fields Element kept in its __dict__ before it had __slots__. """
+
+    def __init__(self, level, pointer, tag, value, crlf=None):
+        self.__level    = level
+        self.__pointer  = pointer
+        self.__tag      = tag
+        self.__value    = value
+        self.__crlf     = crlf or "\n"
+        self.__children = []
+        self.__parent   = None
+
+    def add_child(self, element):
+        self.__children.append(element)
+
+    def add_parent(self, element):
+        self.__parent   = element
+
+    pass
+#   DictElement
+
+
+def dict_elements(path):
+    """ Return the DictElement()s of the file's lines, put together as Gedcom() puts Elements together. """
+    elements    = []
+    stack       = []
+    with open(path) as f:
+        for line_num, line in enumerate(f, 1):
+            parts   = gedcom.parse_line_parts(line_num, line)
+            if  parts is None:
+                continue
+            element = DictElement(*parts)
+            del stack[parts[0]:]
+            if  stack:
+                stack[-1].add_child(element)
+                element.add_parent(stack[-1])
+            stack.append(element)
+            elements.append(element)
+        pass
+    return elements
+
+
+def measure(load):
+    """ Return (what load() returns, the bytes it took). """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        loaded  = load()
+        gc.collect()
+        size    = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return loaded, size
+
+
+def main():
+    people      = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    path        = sys.argv[2] if len(sys.argv) > 2 else None
+    temp_path   = None
+    if  not path:
+        fd, temp_path   = tempfile.mkstemp(suffix = '.ged')
+        os.close(fd)
+        path    = temp_path
+        write_gedcom(path, people)
+    try:
+        before, before_size = measure(lambda : dict_elements(path))
+        count               = len(before)
+        before              = None
+        g, after_size       = measure(lambda : gedcom.Gedcom(path))
+        if  len(g.element_list()) != count:
+            raise AssertionError("%d elements, not %d" % ( len(g.element_list()), count, ))
+        tracemalloc.start()
+        start   = tracemalloc.get_traced_memory()[0]
+        for e in g.element_list():
+            e.children()                        # each leaf gets a list of its own
+        listed_size     = after_size + tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        print("%d elements, values included" % count)
+        print("    before __slots__:                       %7.1f bytes an element" % ( float(before_size) / count, ))
+        print("    Element:                                %7.1f bytes an element" % ( float(after_size) / count, ))
+        print("    Element, after children() of each one:  %7.1f bytes an element" % ( float(listed_size) / count, ))
+    finally:
+        if  temp_path:
+            os.remove(temp_path)
+        pass
+    pass
+
+
+if  __name__ == '__main__':
+    main()
+
+
+#
+# eof
@@ -52,16 +52,61 @@
 #       January 13, 2018        bar     bfr for before and many others
 #       January 14, 2018        bar     more date parsing details
 #       January 19, 2018        bar     yyyymmdd/mmddyyyy and such - go with 1300+ years first, figuring years in this form won't be earlier than 1300.
+#       October 18, 2026                iter_records() - stream level-0 records without keeping the whole file
+#                                       open files with mode 'r' under python3 ('rU' is gone as of 3.11)
+#                                       __all__ holds names, not objects, so "from gedcom import *" works
+#                                       Element uses __slots__, interns tag/pointer/crlf and shares an empty children tuple among leaves
+#                                       Gedcom(storage = "columnar") - ElementTable/ElementView struct-of-arrays storage
+#                                       Gedcom(storage = "mmap") - split memory-mapped files as bytes and decode values only when used
+#                                       pass Gedcom()'s encoding and opener on to open() as documented
+#                                       Gedcom(workers = N) - parse chunks of level 0 records in a process pool
+#                                       Gedcom(storage = "lazy") - RecordIndex of level 0 record offsets, records parsed on demand
+#                                       Gedcom.load(cache_dir = ...) - binary ElementTable snapshots of unchanged files
+#                                       RecordParser - feed()/close() push parser handing off level-0 records
+#                                       Element.full_value() - CONC/CONT values joined and kept. Gedcom(fold_continuations = True)
+#                                       Element.children_with_tag() - tag index of children used by the accessors
+#                                       RelationshipGraph - parent/child/spouse Adjacency lists used by families(), get_parents(), etc.
+#                                       Closures - get_ancestors() without recursion or duplicates. get_descendants(). Memoized closure bitsets
+#                                       relationship.py - relationship(), relationships(), shortest_path(). find_path_to_anc() finds a shortest path
+#                                       get_ancestors(natural_line = True) and find_path_to_anc(natural_line = True) follow natural parents all the way up
+#                                       kinship.py - Pedigree topological order, inbreeding() for everyone, kinship() of pairs from path coefficients kept a block at a time
+#                                       Gedcom.query() - compile_criteria() once and select from the PersonTable columns
+#                                       NameIndex - trigram, exact and prefix name lookups. Gedcom.find_names()
+#                                       SimilarNameIndex - soundex() and trigram shortlists for str_ratio(). Gedcom.find_similar_names()
+#                                       duplicates.py - Gedcom.find_duplicates() scores blocked pairs of people in a process pool
+#                                       YearIndex - bisect birth/death/marriage years, with slack for about/before/after. Gedcom.find_by_year()
+#                                       iter_descendants(), iter_ancestors() - lazy (element, generation, family) walks, breadth or depth first
+#                                       DateCache - thread-safe LRU date_cache with hit/miss/eviction counts. Gedcom(date_cache = ...). death_key()
+#                                       a_date.parse_tokens() - one pass over date strings' tokens, with parse_cascade() for the rest. best_ascii() leaves ASCII be
+#                                       MonthMatcher - prefix map, str_ratio_bound() pruning and a memo behind best_month(). add_month_names()
+#                                       Gedcom.parse_all_dates(workers = N) - each different DATE value parsed once, in a process pool, in to columns
+#                                       a_date uses __slots__ and is ordered and hashed by its packed key(). to_ordinal(). pack_dates(), unpack_dates(), date_key_fields()
 #
 #
 
 
 # Global imports
 from    __future__  import  print_function
+import  array
+import  bisect
+import  calendar
+import  codecs
+import  collections
+import  contextlib
+import  datetime
 import  difflib
+import  hashlib
+import  heapq
+import  io
+import  locale
+import  marshal
+import  mmap
+import  multiprocessing
+import  os
 import  re
 import  string
 import  sys
+import  threading
 
 
 ged_line_re = re.compile(
@@ -78,7 +123,89 @@ ged_line_re = re.compile(
     )
 
 
+def parse_line_parts(line_num, line):
+    """Split one GEDCOM line into (level, pointer, tag, value, crlf).
+
+    Return None for a blank line. Raise SyntaxError if the line does not
+    match ged_line_re.
+    """
+    g   = ged_line_re.match(line)
+    if  g:
+        line_parts = g.groups()
+    elif not line.strip():
+        return None                         # allow blank lines
+    else:
+        errmsg = ("Line %d of document violates GEDCOM format" % line_num +
+                  "\nSee: http://homepages.rootsweb.ancestry.com/" +
+                  "~pmcbride/gedcom/55gctoc.htm")
+        raise SyntaxError(errmsg)
+
+    level   = int(line_parts[0])
+    pointer = line_parts[1].rstrip(' ')
+    tag     = line_parts[2]
+    value   = line_parts[3][1:]             # not .lstrip(' ') so CONC elements can have leading spaces so as not to need trailing spaces   - from github:mtdcr
+    crlf    = line_parts[4]                 # github:mtdcr
+    return (level, pointer, tag, value, crlf)
+
+
+def check_line_level(line_num, level, last_level):
+    """ Raise SyntaxError if a line is more than one level deeper than the line before it. """
+    if level > last_level + 1:
+        errmsg = ("Line %d of document violates GEDCOM format" % line_num +
+                  "\nLines must be no more than one level higher than " +
+                  "previous line.\nSee: http://homepages.rootsweb." +
+                  "ancestry.com/~pmcbride/gedcom/55gctoc.htm")
+        raise SyntaxError(errmsg)
+
+
+def open_gedcom_file(filepath,
+                     encoding=None,
+                     errors=None,
+                     opener=None,
+                    ):
+    """
+        Open a GEDCOM file for reading lines of text and skip any UTF-8 byte order mark.
+
+        Return (file, encode), where encode is 'utf8' if there was a byte order mark and '' otherwise.
+
+    """
+    encode  = ''
+    if  sys.version_info[0] >= 3 :
+        gedcom_file = open(filepath,
+                           mode='r',                # universal newlines are the default in python3 ('U' is gone as of 3.11)
+                           encoding=encoding,
+                           errors = errors,
+                           newline=None,            # github:rltest: \r\n is part of the gedcom 5.5 spec. bar: But be liberal in what we accept.
+                           opener=opener,
+                          )
+        pass
+    else:
+        gedcom_file = open(filepath, 'rU')
+
+    utf_hdr     = gedcom_file.read(1)
+    if  utf_hdr == '\ufeff':                        # python3
+        encode  = 'utf8'                            # maybe we should do something with this, but if we're defaulting to utf8, it's hard to say what
+    else:
+        utf_hdr    += gedcom_file.read(2)
+        if  utf_hdr == '\xef\xbb\xbf':              # python2
+            encode  = 'utf8'
+        else:
+            gedcom_file.seek(0)                     # normal file
+        pass
+    return gedcom_file, encode
+
+
 import  unicodedata
+try :
+    from    collections.abc import  Mapping
+except ImportError :
+    from    collections     import  Mapping         # python2
+
+try :
+    import  numpy
+except ImportError :
+    numpy           = None                          # optional: PersonTable uses it if it's there
+
 try :
     from    types   import ListType, TupleType, UnicodeType, DictionaryType
     bytes           = str
@@ -90,6 +217,11 @@ except ImportError :
     unicode         = str
     basestring      = str
 
+try :
+    intern          = sys.intern
+except AttributeError :
+    pass                                            # python2's built-in intern()
+
 def convert_to_unicode(s) :
     """ Try to convert the given string to unicode as best we can guess. """
     if  not isinstance(s, UnicodeType) :
@@ -100,12 +232,16 @@ def convert_to_unicode(s) :
         pass
     return(s)
 
+non_ascii_re    = re.compile(r'[^\x00-\x7f]')
+
 def best_ascii(unicode_s) :
     """
         Return the best guess as to ASCII characters that could be used for the given string.
     """
 
     unicode_s   = convert_to_unicode(unicode_s)
+    if  not non_ascii_re.search(unicode_s) :
+        return(unicode_s)                       # NFKD leaves ASCII characters as they are
 
     #
     #   NFKD doesn't work for a lot of characters \u0189, for instance, should be a D
@@ -151,47 +287,211 @@ def str_ratio(nm1, nm2) :
     return (all + (sta * 4.0) + (end * 2.0)) / 7.0
 
 
+def str_ratio_bound(len1, len2, common, start_common, end_common) :
+    """
+        Return a number that str_ratio() of names len1 and len2 letters long can't be more than,
+        given how many letters the names, their first 3 letters and their last 3 letters have in common
+        (which is at least as many as SequenceMatcher finds matching up in order).
+
+    """
+    all = 2.0 * common       / (len1 + len2)
+    sta = 2.0 * start_common / (min(len1, 3) + min(len2, 3))
+    if  min(len1, len2) < 6 :
+        return (all + (sta * 2.0)) / 3.0
+    end = 2.0 * end_common   / (min(len1, 3) + min(len2, 3))
+    return (all + (sta * 4.0) + (end * 2.0)) / 7.0
+
+
 HELPP   = ""            # "":no_print   "\n":print_CRLF     else:print_no_CRLF
 
-def best_month(name) :
-    """ Return our best guess (1..12) as to what month the named month is. Zero means we don't know. """
-    name       = best_ascii((name or '').lower())
-    bm      = -1
-    bd      = 0.0
-    mh      = 0.0
-    if  name   :
-        for mnms in month_names :
-            if  len(name) >= 3 :
-                ma  = [ mi for mi, mn in enumerate(mnms) if mn.startswith(name) ]
-                if  len(ma) == 1 :
-                    d       = len(name)
-                    if  bd  < d :
-                        bd  = d                 # if the whole given name (3 letters or longer) starts a month name, give the month the score of the length of the name
-                        bm  = ma[0]
-                        mh  = 1.0               #    for debugging printout
-                        break                   #    and be done with it - none of our names start ambiguously - june/july are the closest
-                    pass
+MONTH_MEMO_SIZE = 1 << 12       # how many fuzzy matches a MonthMatcher remembers
+
+
+class   MonthMatcher(object) :
+    """
+        best_month() for lists of twelve month names, January first, a list for each language.
+
+        search() is how best_month() has always worked. month() gives the same
+        answers without it most of the time:
+
+        prefixes    - { 3 or more letters : month 1..12 } for every start of a month name that starts only one month name in a language (the first such language's month)
+        memo        - { name : month 0..12 } of the names that needed search()'s fuzzy str_ratio() matching, up to memo_size of them
+
+        add() a language and the prefixes get the starts of its month names that aren't in the prefixes already.
+
+    """
+
+    def __init__(me, languages = (), memo_size = MONTH_MEMO_SIZE) :
+        me.languages    = []
+        me.names        = []                            # all the languages' month names, lower()'d, one after another
+        me.letters      = ( {}, {}, {}, )               # letter -> how many times it's in each of the names, in their first 3 letters, in their last 3 letters
+        me.least        = {}                            # ( 0, 1 or 2, letter, n, ) -> min(n, each of that me.letters list)
+        me.prefixes     = {}
+        me.memo         = {}
+        me.memo_size    = memo_size
+        for names in languages :
+            me.add(names)
+        pass
+
+
+    def add(me, names) :
+        """ Add a language's month names, January first. They're lower()'d and best_ascii()'d. """
+        names   = [ best_ascii(name.lower()) for name in names ]
+        if  len(names) != 12 :
+            raise ValueError("12 month names are needed, not %d" % len(names))
+        starts  = {}                                    # start of a month name -> the months it starts
+        for mi, name in enumerate(names) :
+            for length in range(3, len(name) + 1) :
+                starts.setdefault(name[:length], set()).add(mi)
+            pass
+        for start, months in starts.items() :
+            if  (len(months) == 1) and (start not in me.prefixes) :
+                me.prefixes[start]  = min(months) + 1   # earlier languages keep the starts they have
+            pass
+        me.languages.append(names)
+        for name in names :
+            name    = name.lower()
+            for letters, part in zip(me.letters, [ name, name[:3], name[-3:], ]) :
+                for c in set(part) :
+                    letters.setdefault(c, [ 0 ] * len(me.names))
+                for c, counts in letters.items() :
+                    counts.append(part.count(c))
                 pass
-            mds = [ [ str_ratio(name, mn), mi, ] for mi, mn in enumerate(mnms) ]
-            mds.sort()
-            h   = mds[-1][0]
-            # print(" >" + str(mds[-2:]) + "< " + str(h) + " " + str(h - mds[-2][0]))
+            me.names.append(name)
+        me.least.clear()
+        me.memo.clear()                                 # the new language may be a better fuzzy match for some names
+
+
+    def month(me, name) :
+        """ Return our best guess (1..12) as to what month the named month is. Zero means we don't know. """
+        name    = best_ascii((name or '').lower())
+        if  HELPP :
+            return me.search(name)                      # for its printout
+        if  len(name) >= 3 :
+            m   = me.prefixes.get(name)
+            if  m :
+                return m
+            pass
+        m       = me.memo.get(name)
+        if  m is None :
+            m   = me.fuzzy(name)
+            if  len(me.memo) >= me.memo_size :
+                me.memo.clear()
+            me.memo[name]   = m
+        return m
+
+
+    def fuzzy(me, name) :
+        """
+            Return search() of a name that's been lower()'d and best_ascii()'d and that doesn't start just one month name in any language.
+
+            str_ratio() is only called for the months whose str_ratio_bound() is high enough for them to be one of their language's best two.
+
+        """
+        if  not name :
+            return 0
+        low     = name.lower()
+        common  = []                                    # for the name, its first 3 letters, its last 3 letters: how many letters each of me.names has in common with it
+        for which, part in enumerate([ low, low[:3], low[-3:], ]) :
+            rows    = []
+            for c in set(part) :
+                key = ( which, c, part.count(c), )
+                row = me.least.get(key)
+                if  row is None :
+                    row = me.least[key] = [ min(key[2], count) for count in me.letters[which].get(c, [ 0 ] * len(me.names)) ]
+                rows.append(row)
+            common.append([ sum(counts) for counts in zip(*rows) ] if rows else [ 0 ] * len(me.names))
+        bm      = -1
+        bd      = 0.0
+        j       = 0                                     # where the language's names are in me.names
+        for mnms in me.languages :
+            bounds  = [ ( str_ratio_bound(len(low), len(me.names[j + mi]), common[0][j + mi], common[1][j + mi], common[2][j + mi]), mi, ) for mi in range(len(mnms)) ]
+            j      += len(mnms)
+            bounds.sort(reverse = True)
+            if  bounds[0][0] < 0.7 :
+                continue
+            mds     = []
+            for bound, mi in bounds :
+                if  (len(mds) >= 2) and (bound < mds[-2][0]) :
+                    break                               # it, and the rest, can't be in the best two
+                mds.append([ str_ratio(name, mnms[mi]), mi, ])
+                mds.sort()
+            h       = mds[-1][0]
             if  h >= 0.7    :
                 d   = h - mds[-2][0]
-                if  d >= 0.2    :
-                    if  bd  < d :               # to find the language, find the best month in the list of months that's the most different from the 2nd best in that language
-                        bd  = d
-                        bm  = mds[-1][1]
+                if  (d >= 0.2) and (bd < d) :
+                    bd  = d
+                    bm  = mds[-1][1]
+                pass
+            pass
+        return bm + 1
+
+
+    def search(me, name) :
+        """ Return month() of a name that's been lower()'d and best_ascii()'d, by looking at each language's month names. """
+        bm      = -1
+        bd      = 0.0
+        mh      = 0.0
+        if  name   :
+            for mnms in me.languages :
+                if  len(name) >= 3 :
+                    ma  = [ mi for mi, mn in enumerate(mnms) if mn.startswith(name) ]
+                    if  len(ma) == 1 :
+                        d       = len(name)
+                        if  bd  < d :
+                            bd  = d                 # if the whole given name (3 letters or longer) starts a month name, give the month the score of the length of the name
+                            bm  = ma[0]
+                            mh  = 1.0               #    for debugging printout
+                            break                   #    and be done with it - none of our names start ambiguously - june/july are the closest
+                        pass
                     pass
+                mds = [ [ str_ratio(name, mn), mi, ] for mi, mn in enumerate(mnms) ]
+                mds.sort()
+                h   = mds[-1][0]
+                # print(" >" + str(mds[-2:]) + "< " + str(h) + " " + str(h - mds[-2][0]))
+                if  h >= 0.7    :
+                    d   = h - mds[-2][0]
+                    if  d >= 0.2    :
+                        if  bd  < d :               # to find the language, find the best month in the list of months that's the most different from the 2nd best in that language
+                            bd  = d
+                            bm  = mds[-1][1]
+                        pass
+                    pass
+                mh  = max(mh, h)
+            if  HELPP :
+                print("@@@@ mh name", mh, bd, bm + 1, "[" + name + "]", end = "")
+                if  HELPP == '\n' :
+                    print("")
                 pass
-            mh  = max(mh, h)
-        if  HELPP :
-            print("@@@@ mh name", mh, bd, bm + 1, "[" + name + "]", end = "")
-            if  HELPP == '\n' :
-                print("")
             pass
-        pass
-    return bm + 1
+        return bm + 1
+
+    pass
+#   MonthMatcher
+
+
+month_matcher   = MonthMatcher(month_names)
+
+
+def best_month(name) :
+    """ Return our best guess (1..12) as to what month the named month is. Zero means we don't know. """
+    return month_matcher.month(name)
+
+
+def add_month_names(names) :
+    """
+        Add a language's twelve month names, January first, to month_names, for best_month() and the date regexes.
+
+        Names can't be longer than month_word_max - 1, which the date regexes were made for.
+        Dates that are already cached aren't parsed again.
+
+    """
+    names   = [ best_ascii(name.lower()) for name in names ]
+    if  max([ len(name) for name in names ] or [ 0 ]) > month_word_max - 1 :
+        raise ValueError("month names can't be longer than %d letters" % ( month_word_max - 1, ))
+    month_matcher.add(names)
+    month_names.append(month_matcher.languages[-1])
+    date_templates.clear()
 
 
 dres            = r'(?:0[1-9]|[12]\d|3[0-1])'
@@ -209,7 +509,8 @@ yres            = r'(' +     yres + r')'
 any_yres        = r'(' + any_yres + r')'
 Yres            = r'(' +     Yres + r')'
 
-mn_res          = r'([a-z]{3,%u})'  % (max([ max([ len(mn) for mn in mns ]) for mns in month_names ]) + 1)      # +1 to let them mistype an extra character, worst case
+month_word_max  = max([ max([ len(mn) for mn in mns ]) for mns in month_names ]) + 1          # +1 to let them mistype an extra character, worst case
+mn_res          = r'([a-z]{3,%u})'  % month_word_max
 
 slres           = r'\s*\/\s*'
 dtres           = r'\s*\.\s*'
@@ -245,6 +546,144 @@ about_re        = re.compile(r'(?<![a-z])(prob(ably)?|maybe|abo?u?t?\.?|appro?x?
 after_re        = re.compile(r'(?<![a-z])(afte?r?\.?|since)(?![a-z])',                                  re.IGNORECASE)
 before_re       = re.compile(r'(?<![a-z])(((befo?r?e?|bfo?r)\.?)|by(?!\s+census)|as\s+of)(?![a-z])',    re.IGNORECASE)
 
+#
+#   a_date.parse_tokens() splits a date string into numbers, words and what's between them in one go and reads the everyday shapes of dates from a table.
+#   It only answers when it's sure the regex cascade, a_date.parse_cascade(), would give the same answer.
+#   Date strings that differ only in their digits ("12 JAN 1850", "03 JAN 1799") are split and looked up once, as one date_template().
+#
+date_token_re   = re.compile(r'[0-9]+|[a-z]+|[^0-9a-z]+')
+date_token_kind = dict([ ( c, 'n', ) for c in string.digits ] + [ ( c, 'w', ) for c in string.ascii_lowercase ])       # by the token's 1st character, else 's'
+space_sep_re    = re.compile(r'\s*\Z')
+m_y_sep_re      = re.compile(r'[\s,\.]*\Z')
+m_d_sep_re      = re.compile(r'[\s\.]*\Z')
+d_y_sep_re      = re.compile(r'[\s,]+\Z')
+day_tokens      = frozenset([ str(dy) for dy in range(1, 10) ] + [ '%02u' % dy for dy in range(1, 32) ])     # what any_dres takes
+
+date_shapes     = {                                                 # numbers (n) and words (w) -> what's allowed between them, and what they are
+                    'nwn'   : ( ( space_sep_re, m_y_sep_re, ),  'dmy', ),      # 12 Jan 1850        as d_mnm_y_re
+                    'wnn'   : ( ( m_d_sep_re,   d_y_sep_re, ),  'mdy', ),      # Jan 12, 1850       as mnm_d_y_re
+                    'wn'    : ( ( m_y_sep_re, ),                'my',  ),      # Jan 1850           as mnm_y_re
+                    'n'     : ( (),                             'y',   ),      # 1850               as yyyy_re
+                  }
+
+def date_token_shapes(shapes) :
+    """ Return { shape : what each token must be } for date_shapes, with what's between the numbers and words as tokens (s) of their own when it's there: { 'nswsn' : ( 'd', space_sep_re, 'm', m_y_sep_re, 'y', ), 'nwsn' : ... } """
+    results = {}
+    for shape, ( sep_res, roles, ) in shapes.items() :
+        found   = [ ( shape[0], ( roles[0], ), ) ]
+        for c, rx, role in zip(shape[1:], sep_res, roles[1:]) :
+            longer  = []
+            for s, steps in found :
+                longer.append(( s + 's' + c, steps + ( rx, role, ), ))
+                if  rx.match('') and (c != s[-1]) :               # two numbers or two words in a row would be one token
+                    longer.append(( s + c, steps + ( role, ), ))
+                pass
+            found   = longer
+        results.update(found)
+    return results
+
+date_token_steps    = date_token_shapes(date_shapes)
+
+date_template_re    = re.compile(r'''
+                                    (?:[a-z]+(?![a-z])\.?\s*)*?                 # qualifiers, each word whole, so they aren't split up every which way
+                                    (?:
+                                            0{1,2}\s*[a-z]+[\s,\.]*            # nwn
+                                        |   [a-z]+(?:[\s\.]*0{1,2}[\s,]+)?     # wnn
+                                        |   [a-z]+[\s,\.]*                     # wn
+                                    )?
+                                    0000\Z                                     # n
+                                ''', re.VERBOSE)                              # what date_token_steps could take, and more, to turn away most templates before they're split into tokens
+
+DATE_QUALIFIERS = [ 'abt', 'abt.', 'about', 'est', 'est.', 'estimated', 'c', 'c.', 'ca', 'ca.', 'cir', 'approx', 'maybe', 'probably', 'around',
+                    'aft', 'aft.', 'after', 'since',
+                    'bef', 'bef.', 'befor', 'before', 'bfr',
+                  ]                                                 # not "by" and "as of", which depend on what follows them
+
+def date_qualifier(word) :
+    """ Return 0 if about_re takes all of the word, 1 if after_re does, 2 if before_re does, else None. """
+    for kind, rx in enumerate([ about_re, after_re, before_re, ]) :
+        g   = rx.match(word)
+        if  g and (g.end() == len(word)) :
+            return kind
+        pass
+    return None
+
+date_qualifiers = dict([ ( word, date_qualifier(word), ) for word in DATE_QUALIFIERS if date_qualifier(word) is not None ])
+
+
+DATE_TEMPLATES_MAX  = 1 << 12   # how many date_templates are remembered
+
+date_templates  = {}            # date string with its digits changed to 0s -> date_template() of it
+zero_digits     = dict([ ( ord(c), u'0', ) for c in '123456789' ])
+
+def date_template(template) :
+    """
+        Return ( year slice, day slice, month, about, after, before, ) or False for a date string with its digits changed to 0s.
+
+        The template is split into numbers, words and what's between them. Leading
+        date_qualifiers are taken off. What's left must be in date_token_steps, with
+        a month word that the cascade's regexes would take as one, or it's False.
+        The slices pick the year and day out of any date string with the template.
+        Remembered in date_templates, unless date_template_re turns it away, which is
+        quicker than remembering it, as most such strings are one of a kind.
+
+    """
+    if  not date_template_re.match(template) :
+        return False
+    tokens  = date_token_re.findall(template)
+    shape   = ''.join([ date_token_kind.get(token[0], 's') for token in tokens ])
+    flags   = [ False, False, False, ]                          # about, after, before
+    i       = 0
+    at      = 0                                                 # where tokens[i] starts in the template
+    rule    = False
+    steps   = None
+    while shape[i : i + 1] == 'w' :
+        word    = tokens[i]
+        width   = 2 if shape[i + 1 : i + 2] == 's' else 1       # the word, and what's after it, if anything
+        between = tokens[i + 1] if width == 2 else ''
+        if  (between[:1] == '.') and ((word + '.') in date_qualifiers) :
+            word   += '.'
+            between = between[1:]
+        kind    = date_qualifiers.get(word)
+        if  kind is None :
+            steps   = date_token_steps.get(shape[i:])
+            break
+        if  not space_sep_re.match(between) :
+            break                                               # like "cir." - about_re leaves the "."
+        flags[kind] = True
+        at         += sum([ len(token) for token in tokens[i : i + width] ])
+        i          += width
+    else :
+        steps   = date_token_steps.get(shape[i:])
+    if  steps is not None :
+        y_slice = d_slice   = None
+        m       = 0
+        for step, token in zip(steps, tokens[i:]) :
+            if  step == 'y' :
+                y_slice = slice(at, at + len(token)) if len(token) == 4 else None
+                if  y_slice is None :
+                    break
+                pass
+            elif step == 'd' :
+                d_slice = slice(at, at + len(token))
+            elif step == 'm' :
+                if  (not (3 <= len(token) <= month_word_max)) or (date_qualifier(token) is not None) :
+                    break
+                m   = best_month(token)
+                if  m <= 0 :
+                    break
+                pass
+            elif (token != ' ') and (not step.match(token)) :
+                break
+            at += len(token)
+        else :
+            rule    = ( y_slice, d_slice, m or None, flags[0], flags[1], flags[2], )
+        pass
+    if  len(date_templates) >= DATE_TEMPLATES_MAX :
+        date_templates.clear()
+    date_templates[template]    = rule
+    return rule
+
 alive_re        = re.compile(r'(^No?$|(?<![a-z])not\s+(deceased?|dead|daed|died|deid|dec)(?![a-z]))',   re.IGNORECASE)
 dead_re         = re.compile(r'''
                                 (
@@ -297,7 +736,144 @@ dead_re         = re.compile(r'''
                                 )''', re.IGNORECASE | re.VERBOSE)
 
 
-date_cache      = {}            # to speed up programs, we'll remember all the a_date()'s we've calculated. keyed by the original string, valued by a_date() (Note the user can futz with the a_date() and mess himself up if he doesn't know we have it cached.)
+DATE_CACHE_SIZE = 1 << 17       # how many parsed dates the date_cache remembers
+
+_MISSING        = object()
+
+
+def death_key(d) :
+    """ Return the DateCache key of a_date.parse_death_date()'s result for the date string, which can differ from a_date.parse()'s. """
+    return ( "DEAT", d, )
+
+
+class   DateCache(object) :
+    """
+        A thread-safe cache of a_date()s that forgets the least recently used ones past max_size (None: never).
+
+        a_date.parse() keeps its results under the date strings, and
+        a_date.parse_death_date() under death_key()s of them, so the two
+        don't get each other's results.
+
+        Dates are cached in the module's date_cache, unless another
+        DateCache is being used in the thread, in a "with cache.use():"
+        block. Gedcom(date_cache = DateCache()) gives a Gedcom its own.
+
+        hits, misses and evictions count lookups that found something,
+        lookups that didn't and dates that were forgotten.
+
+    """
+
+    def __init__(me, max_size = DATE_CACHE_SIZE) :
+        me.max_size     = max_size
+        me.hits         = 0
+        me.misses       = 0
+        me.evictions    = 0
+        me.__entries    = collections.OrderedDict()                 # least recently used first
+        me.__lock       = threading.Lock()
+
+
+    def get(me, key, default = None) :
+        """ Return the cached date of the key, or default. Count a hit or a miss. """
+        with me.__lock :
+            entries = me.__entries
+            value   = entries.pop(key, _MISSING)
+            if  value is _MISSING :
+                me.misses  += 1
+                return default
+            entries[key]    = value                                 # now the most recently used
+            me.hits        += 1
+            return value
+
+
+    def put(me, key, value) :
+        """ Cache the date under the key, forgetting the least recently used dates if there are too many. """
+        with me.__lock :
+            entries         = me.__entries
+            entries.pop(key, None)
+            entries[key]    = value
+            while (me.max_size is not None) and (len(entries) > me.max_size) :
+                entries.popitem(last = False)
+                me.evictions   += 1
+            pass
+        pass
+
+
+    def resize(me, max_size) :
+        """ Change max_size, forgetting the least recently used dates if there are too many now. """
+        with me.__lock :
+            me.max_size = max_size
+            entries     = me.__entries
+            while (max_size is not None) and (len(entries) > max_size) :
+                entries.popitem(last = False)
+                me.evictions   += 1
+            pass
+        pass
+
+
+    def clear(me) :
+        """ Forget all the dates. The counters are kept. """
+        with me.__lock :
+            me.__entries.clear()
+        pass
+
+
+    def stats(me) :
+        """ Return { 'hits', 'misses', 'evictions', 'size', 'max_size' }. """
+        with me.__lock :
+            return { 'hits': me.hits, 'misses': me.misses, 'evictions': me.evictions, 'size': len(me.__entries), 'max_size': me.max_size, }
+
+
+    @contextlib.contextmanager
+    def use(me) :
+        """ Cache the dates parsed in this thread in this DateCache in a "with" block. """
+        previous            = getattr(_date_caches, 'cache', None)
+        _date_caches.cache  = me
+        try :
+            yield me
+        finally :
+            _date_caches.cache  = previous
+        pass
+
+
+    # a few dict things, for code that used date_cache when it was a dict
+
+    def __len__(me) :
+        return len(me.__entries)
+
+
+    def __contains__(me, key) :
+        with me.__lock :
+            return key in me.__entries
+
+
+    def __getitem__(me, key) :
+        value   = me.get(key, _MISSING)
+        if  value is _MISSING :
+            raise KeyError(key)
+        return value
+
+
+    def __setitem__(me, key, value) :
+        me.put(key, value)
+
+
+    def __delitem__(me, key) :
+        with me.__lock :
+            del me.__entries[key]
+        pass
+
+    pass
+#   DateCache
+
+
+date_cache      = DateCache()   # to speed up programs, we'll remember the a_date()'s we've calculated. keyed by the original string (or death_key()), valued by a_date() (Note the user can futz with the a_date() and mess himself up if he doesn't know we have it cached.)
+_date_caches    = threading.local()
+
+
+def current_date_cache() :
+    """ Return the DateCache that's being used in this thread: the date_cache, unless another's use() says otherwise. """
+    cache   = getattr(_date_caches, 'cache', None)
+    return date_cache if cache is None else cache
 
 #
 #
@@ -348,6 +924,17 @@ date_cache      = {}            # to speed up programs, we'll remember all the a
 #
 
 class   a_date(object) :
+    """
+        A date, or as much of one as a date string says, with "about", "before" and "after" flags.
+
+        Dates are ordered, and equal and hashed, by their key(): year, then month, then day,
+        with missing parts before present ones, then the flags. sorted(dates, key = a_date.key)
+        is quicker than sorted(dates). Don't change a date that's been put in a dict or set
+        (or one from parse(), which is shared by everyone who parsed the string).
+
+    """
+
+    __slots__       = ( 'year', 'month', 'day', 'about', 'before', 'after', )
 
     def __init__(me, y = None, m = None, d = None, about = False, before = False, after = False) :
         me.year     = None if not y else int(y)             # None or the year 1..20xx
@@ -373,12 +960,60 @@ class   a_date(object) :
     @staticmethod
     def parse(d) :
         """ Return None or a_date() for the given date string. """
-        if  d in date_cache :
-            return date_cache[d]
+        cache   = current_date_cache()
+        date    = cache.get(d, _MISSING)
+        if  date is not _MISSING :
+            return date
         od      = d
 
         date    = None
         d       = best_ascii((d or '').strip().lower())         # best_ascii() to match up with the month names, which have already been best_ascii()'d
+        if  d   :
+            date    = a_date.parse_tokens(d) or a_date.parse_cascade(d)
+
+        cache.put(od, date)
+
+        return date
+
+
+    @staticmethod
+    def parse_tokens(d) :
+        """
+            Return the a_date() for a date string that's been through parse()'s strip(), lower() and best_ascii(), if it's in one of the shapes in date_shapes.
+            Return None if it isn't, or if parse_cascade() might read it differently - which is what parse() then calls.
+
+            The string is split into numbers, words and what's between them once, by date_template(),
+            rather than searched by regex after regex. Then the year and day are checked.
+
+        """
+        template    = d.translate(zero_digits)
+        rule        = date_templates.get(template)
+        if  rule is None :
+            rule    = date_template(template)
+        if  not rule :
+            return None
+        y_slice, d_slice, m, about, after, before = rule
+        y           = None
+        if  y_slice is not None :
+            y       = d[y_slice]
+            if  y > '2029' :                                    # what yres takes
+                return None
+            pass
+        if  d_slice is None :
+            return a_date(y, m, None, about, before, after)
+        dy          = d[d_slice]
+        if  dy not in day_tokens :
+            return None
+        return a_date(y, m, dy, about, before, after).if_valid()
+
+
+    @staticmethod
+    def parse_cascade(d) :
+        """
+            Return None or a_date() for a date string that's been through parse()'s strip(), lower() and best_ascii(), trying one regex after another.
+            This is how parse() reads what parse_tokens() can't.
+        """
+        date    = None
         if  d   :
             abt     = about_re.search(d)
             if  abt :
@@ -521,14 +1156,11 @@ class   a_date(object) :
                 pass
             if  False       :
                 if  not date :
-                    print("@@@@ >>>> %s" % od)
+                    print("@@@@ >>>> %s" % d)
                 else        :
-                    print("@@@@ ---- %s ---- %s" % ( od, str(date), ))
+                    print("@@@@ ---- %s ---- %s" % ( d, str(date), ))
                 pass
             pass
-
-        date_cache[od]      = date
-
         return date
 
 
@@ -536,7 +1168,9 @@ class   a_date(object) :
     def parse_death_date(d) :
         """ Return None or a_date() for the given date string. """
         od          = d
-        if  d not  in date_cache :
+        cache       = current_date_cache()
+        date        = cache.get(death_key(od), _MISSING)
+        if  date is _MISSING :
             dd      = d
             d       = (d or '').strip().lower()
             if  d and (not alive_re.search(d)) and dead_re.search(d) :
@@ -545,15 +1179,25 @@ class   a_date(object) :
                     dd              = d
                 pass
             # print("@@@@ death dd:[" + dd + "] ", end = '')
-            date                    = a_date.parse(dd)
-            date_cache[od]          = date                  # also, put it under the original string in case it's different from dd
-            if  not date            :
-                if  dd != od        :
-                    date            = a_date()              # give them an empty date indicating the guy is dead, even if we don't know when
-                    date_cache[od]  = date                  # we really know what the cache item should be
-                pass
+            date                    = a_date.parse(dd)      # cached under dd, as a_date.parse() caches everything
+            if  (not date) and (dd != od) :
+                date                = a_date()              # give them an empty date indicating the guy is dead, even if we don't know when
+            cache.put(death_key(od), date)                  # under its own key, so a_date.parse(od) isn't given a death date, nor the other way around
             pass
-        return date_cache[od]
+        return date
+
+
+    def to_tuple(me) :
+        """ Return (year, month, day, about, before, after). """
+        return ( me.year, me.month, me.day, me.about, me.before, me.after, )
+
+
+    @staticmethod
+    def from_tuple(t) :
+        """ Return an a_date() with the values of to_tuple(). """
+        date    = a_date()
+        date.year, date.month, date.day, date.about, date.before, date.after = t
+        return date
 
 
     def to_string(me) :
@@ -569,9 +1213,253 @@ class   a_date(object) :
         return (abt + bef + aft + ds + ms + ys).strip()
     __str__         = to_string
 
+
+    def key(me) :
+        """ Return the date packed in to an int: ((year << 4 | month) << 5 | day) << 3 | flags, with 0 for a missing year, month or day and about, before and after as flag bits 1, 2 and 4. """
+        return ((((me.year or 0) << 4 | (me.month or 0)) << 5 | (me.day or 0)) << 3) | (me.about and 1 or 0) | (me.before and 2 or 0) | (me.after and 4 or 0)
+
+
+    @staticmethod
+    def from_key(key) :
+        """ Return the a_date() of a key(), or None for NO_DATE_KEY. """
+        if  key < 0 :
+            return None
+        key     = int(key)
+        return a_date(key >> 12, (key >> 8) & 15, (key >> 3) & 31, key & 1, key & 2, key & 4)
+
+
+    def to_ordinal(me) :
+        """
+            Return (first, last) proleptic Gregorian ordinals (see datetime.date.toordinal()) of the days the date could be, or None if it has no year.
+
+            A year is all its days, a month all of its. The about, before and after flags aren't looked at.
+
+        """
+        if  not me.year :
+            return None
+        if  not (1 <= (me.month or 0) <= 12) :
+            return ( datetime.date(me.year, 1, 1).toordinal(), datetime.date(me.year, 12, 31).toordinal(), )
+        first   = datetime.date(me.year, me.month, 1).toordinal()
+        if  me.day :
+            first  += me.day - 1
+            return ( first, first, )
+        return ( first, first + calendar.monthrange(me.year, me.month)[1] - 1, )
+
+
+    def __eq__(me, other) :
+        return me.key() == other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __ne__(me, other) :
+        return me.key() != other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __lt__(me, other) :
+        return me.key() <  other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __le__(me, other) :
+        return me.key() <= other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __gt__(me, other) :
+        return me.key() >  other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __ge__(me, other) :
+        return me.key() >= other.key() if isinstance(other, a_date) else NotImplemented
+
+    def __hash__(me) :
+        return hash(me.key())
+
+
+    def __getstate__(me) :
+        return me.to_tuple()
+
+    def __setstate__(me, state) :
+        me.year, me.month, me.day, me.about, me.before, me.after = state
+
     #   a_date
 
 
+NO_DATE_KEY     = -1            # pack_dates()'s key for None, which sorts before all the dates
+
+
+def pack_dates(dates, typecode = 'i') :
+    """
+        Return an array.array() of the key()s of a_date()s (NO_DATE_KEY for Nones), for sorting and range checks of lots of dates at once.
+
+        numpy.frombuffer(keys, dtype = numpy.intc) makes a numpy array of the keys without copying them.
+        The dates of the years year1 to year2 have keys from a_date(year1).key() up to, but not including, a_date(year2 + 1).key().
+
+    """
+    return array.array(typecode, [ NO_DATE_KEY if date is None else date.key() for date in dates ])
+
+
+def unpack_dates(keys) :
+    """ Return the a_date()s (or Nones) of a sequence of pack_dates() keys. """
+    from_key    = a_date.from_key
+    return [ from_key(key) for key in keys ]
+
+
+def date_key_fields(keys) :
+    """
+        Return (years, months, days, abouts, befores, afters) of a key(), 0 for missing parts, or of a whole numpy array of keys at once.
+
+        NO_DATE_KEY's fields aren't meaningful, so leave them out first.
+
+    """
+    return ( keys >> 12, (keys >> 8) & 15, (keys >> 3) & 31, keys & 1, (keys >> 1) & 1, (keys >> 2) & 1, )
+
+
+def iter_records(path_or_file,
+                 encoding=None,
+                 errors=None,
+                 opener=None,
+                ):
+    """
+        Yield each level-0 record of a GEDCOM file as a complete Element subtree, one at a time.
+
+        path_or_file may be a file path or an already open file object (text or binary lines).
+        Nothing is kept from one record to the next, so memory use doesn't grow with the size of the file.
+        The yielded records have no parent. Lines are checked just like Gedcom() checks them.
+
+        encoding, errors and opener are passed to open() when given a path.
+
+    """
+    if  hasattr(path_or_file, 'read') :
+        return _iter_records(path_or_file)
+    return _iter_file_records(path_or_file, encoding=encoding, errors=errors, opener=opener)
+
+def _iter_file_records(filepath, **kwargs) :
+    """ Open the file path, yield its records and close the file when done or abandoned. """
+    gedcom_file, encode = open_gedcom_file(filepath, **kwargs)
+    try :
+        for record in _iter_records(gedcom_file) :
+            yield record
+        pass
+    finally :
+        gedcom_file.close()
+    pass
+
+def _iter_records(lines, line_num = 1) :
+    """ Yield the level-0 Element subtrees built from the given GEDCOM lines. """
+    records     = []
+    parser      = RecordParser(records.append, line_num = line_num)
+    for line in lines :
+        if  not isinstance(line, basestring) :
+            line    = convert_to_unicode(line)          # binary file
+        parser._add_line(line)
+        if  records :
+            yield records.pop()
+        pass
+    parser._finish_record()
+    if  records :
+        yield records.pop()
+    pass
+
+
+class   RecordParser(object) :
+    """
+        Push parser: feed() it GEDCOM text or bytes in pieces of any size, and it
+        hands each level-0 record, as a complete Element subtree with no parent,
+        to callback as soon as the next level-0 line (or close()) ends the record.
+
+        callback may be a function taking the record, or a queue (anything with put()).
+
+        Bytes are decoded incrementally with encoding (default: the locale's, as open() does) and errors.
+        Lines end at \r, \n or \r\n, even when the two halves of a \r\n are fed separately.
+        Lines are checked just like Gedcom() checks them, with the same line numbers in the SyntaxError()s.
+
+        For example, to parse a gzipped file as it's decompressed:
+
+            parser  = RecordParser(records.append)
+            for block in iter(lambda : gzip_file.read(1 << 16), b'') :
+                parser.feed(block)
+            parser.close()
+
+    """
+
+    def __init__(self, callback, encoding = None, errors = None, line_num = 1) :
+        if  hasattr(callback, 'put') :
+            callback    = callback.put
+        self.callback   = callback
+        self.line_num   = line_num                      # number of the next line
+        self.encoding   = encoding or locale.getpreferredencoding(False)
+        self.errors     = errors or 'strict'
+        self.__decoder  = None                          # made when the first bytes are fed
+        self.__newlines = io.IncrementalNewlineDecoder(None, translate = True)
+        self.__partial  = ''                            # the start of a line whose end hasn't been fed yet
+        self.__record   = None                          # the level-0 record being built
+        self.__last     = None                          # the last element added to it
+        self.__closed   = False
+
+
+    def feed(self, data) :
+        """ Parse the next piece of the document, text or bytes. """
+        if  self.__closed :
+            raise ValueError("feed() after close()")
+        if  not isinstance(data, unicode) :
+            if  self.__decoder is None :
+                self.__decoder  = codecs.getincrementaldecoder(self.encoding)(self.errors)
+            data    = self.__decoder.decode(data)
+        self.__add_text(self.__newlines.decode(data))
+
+
+    def close(self) :
+        """ Parse what's left of the document and hand off the last record. """
+        if  self.__closed :
+            return
+        text    = self.__decoder.decode(b'', True) if self.__decoder is not None else ''
+        self.__add_text(self.__newlines.decode(text, True))
+        self.__closed   = True
+        if  self.__partial :
+            self._add_line(self.__partial)              # the last line had no newline
+            self.__partial  = ''
+        self._finish_record()
+
+
+    def __add_text(self, text) :
+        if  not text :
+            return
+        lines           = (self.__partial + text).split('\n')
+        self.__partial  = lines.pop()
+        for line in lines :
+            self._add_line(line + '\n')
+        pass
+
+
+    def _add_line(self, line) :
+        """ Add one line (with its end of line characters) to the record being built. """
+        line_num    = self.line_num
+        if  line_num == 1 and line.startswith('\ufeff') :
+            line    = line[1:]                          # byte order mark
+        line_parts  = parse_line_parts(line_num, line)
+        if  line_parts is not None :
+            level, pointer, tag, value, crlf = line_parts
+            last_elem   = self.__last
+            check_line_level(line_num, level, -1 if last_elem is None else last_elem.level())
+            element = Element(level, pointer, tag, value, crlf)
+            if  level == 0 :
+                self._finish_record()
+                self.__record   = element
+            else :
+                parent_elem = last_elem
+                while parent_elem.level() > level - 1:
+                    parent_elem = parent_elem.parent()
+                parent_elem.add_child(element)
+                element.add_parent(parent_elem)
+            self.__last = element
+        self.line_num   = line_num + 1
+
+
+    def _finish_record(self) :
+        """ Hand off the record being built, if there is one. """
+        record          = self.__record
+        if  record is not None :
+            self.__record   = None
+            self.callback(record)
+        pass
+
+    pass
+#   RecordParser
+
+
 class Gedcom(object):
     """Parses and manipulates GEDCOM 5.5 format data
 
@@ -593,37 +1481,432 @@ class Gedcom(object):
 
     opener   - Default: None
 
+    storage  - How the parsed file is kept in memory:
+               "objects"  - Default: one Element per line.
+               "columnar" - parallel arrays in an ElementTable. Elements are
+                            ElementView()s made only when asked for, and
+                            element_dict() maps pointers to table row ids.
+               "mmap"     - like "columnar", but the file is memory-mapped and
+                            split in to lines as bytes. Values are decoded
+                            (using encoding and errors) only when they're
+                            used, so decoding errors show up then, too.
+                            The encoding must be ASCII compatible.
+
+               "lazy"     - only find where each level 0 record is in the file
+                            to start with. A record is parsed (and kept) the
+                            first time element_dict() or get_element() is
+                            asked for it, or when something like
+                            get_parents() needs it. Records are checked for
+                            errors when they're parsed. element_dict() only
+                            has the pointers of level 0 records, and
+                            element_list() parses the whole file.
+
+    workers  - Parse the file in this many processes. The file is cut in to
+               chunks at level 0 lines, the chunks are parsed in to
+               ElementTable()s in a process pool and the tables are put back
+               together in file order, so the result is the same as parsing
+               the file in one go. The encoding must be ASCII compatible.
+               Default: None - parse in this process.
+
+    fold_continuations - With storage="objects", fold the CONC and CONT
+               lines that come right after an element in to that
+               element as it's parsed, instead of making an Element of
+               each of them. Element.full_value() then has the whole
+               value, and print_gedcom() still prints the lines as they
+               were. Default: False.
+
+    date_cache - A DateCache for the dates parsed by this Gedcom's methods,
+               like year_index(), person_table() and marriage_dates().
+               Default: None - use the module's date_cache (or the DateCache
+               being use()d in the thread).
+
 
     """
 
+    STORAGES    = ( "objects", "columnar", "mmap", "lazy", )
+
     def __init__(self, filepath,
                        encoding=None,
                        errors=None,
                        newline=None,
                        opener=None,
+                       storage="objects",
+                       workers=None,
+                       fold_continuations=False,
+                       date_cache=None,
                 ):
         """ Initialize a GEDCOM data object. You must supply a Gedcom file."""
+        if  storage not in self.STORAGES:
+            raise ValueError("storage must be one of: " + ", ".join(self.STORAGES))
+        if  workers and (opener is not None):
+            raise ValueError("opener can't be used with workers")
+        if  workers and (storage == "lazy"):
+            raise ValueError("lazy storage can't be used with workers")
+        if  fold_continuations and (storage != "objects"):
+            raise ValueError("fold_continuations needs storage=\"objects\"")
+        self.__setup(ElementTable() if storage in ( "columnar", "mmap", ) else None)
+        self.__fold         = fold_continuations
+        self.__date_cache   = date_cache
+        if  storage == "lazy":
+            self.__records      = RecordIndex(filepath, encoding=encoding, errors=errors, opener=opener)
+            self.encode         = self.__records.encode
+            self.__element_list = None
+            self.__element_dict = LazyElementDict(self.__records)
+        elif workers and workers > 1:
+            self.__parse_parallel(filepath, workers, encoding=encoding, errors=errors, storage=storage)
+        else:
+            self.__parse(filepath, encoding=encoding, errors=errors, opener=opener, storage=storage)
+
+    def __setup(self, table=None):
+        """ Start out with no elements, kept in the given ElementTable if there is one. """
         self.__element_list = []
         self.__element_dict = {}
         self.__element_top  = Element(-1, "", "TOP", "")
-        self.__parse(filepath, errors=errors)
+        self.__table        = table
+        self.__records      = None
+        self.__fold         = False
+        self.__graph        = None
+        self.__closures     = {}
+        self.__calculators  = {}
+        self.__people       = None
+        self.__year_indexes = {}
+        self.__date_cache   = None
         self.encode         = ''
+        if  table is not None:
+            self.__element_list = ElementTableList(table)
+            self.__element_dict = table.pointers
+        pass
 
-    def element_list(self):
-        """ Return a list of all the elements in the Gedcom file.
+    @classmethod
+    def load(cls, filepath, cache_dir=None, storage="objects", dates=False, encoding=None, errors=None, date_cache=None):
+        """ Return a Gedcom of the file, using a snapshot of it in cache_dir if there's a good one.
 
-        By default elements are in the same order as they appeared in the file.
-        """
-        return self.__element_list
+        The first time a file is loaded, a binary snapshot of its parsed
+        ElementTable (the element arrays and the pointer index) is written
+        to cache_dir. Later loads use the snapshot as long as the file's
+        size, modification time and SHA-1 hash haven't changed.
 
-    def element_dict(self):
+        storage can be "objects", "columnar" or "mmap" (see Gedcom()).
+
+        If dates is True, the a_date.parse()/a_date.parse_death_date()
+        results of all the DATE values (as print_dates() parses them) are
+        put in the snapshot, and loading it puts them in the Gedcom's
+        date_cache() (see Gedcom()).
+
+        With no cache_dir, this is just Gedcom(filepath, ...).
+        """
+        if  storage not in ( "objects", "columnar", "mmap", ):
+            raise ValueError("storage must be one of: objects, columnar, mmap")
+        if  cache_dir is None:
+            return cls(filepath, encoding=encoding, errors=errors, storage=storage, date_cache=date_cache)
+        stat            = os.stat(filepath)
+        source          = {
+                            'size':     stat.st_size,
+                            'mtime':    stat.st_mtime,
+                            'sha1':     file_sha1(filepath),
+                            'encoding': encoding,
+                            'errors':   errors,
+                            'mapped':   storage == "mmap",
+                          }
+        snapshot_path   = os.path.join(cache_dir, "%s%s.gedsnap" % ( hashlib.sha1(os.path.abspath(filepath).encode('utf8')).hexdigest(), source['mapped'] and "-mmap" or "", ))
+        snapshot        = read_snapshot(snapshot_path, source)
+        if  snapshot is None:
+            gedcom      = cls(filepath, encoding=encoding, errors=errors, storage=storage == "mmap" and "mmap" or "columnar", date_cache=date_cache)
+            table       = gedcom.__table
+            snapshot    = table.snapshot()
+            snapshot['source']  = source
+            snapshot['encode']  = gedcom.encode
+            if  dates:
+                with gedcom.date_cache().use():
+                    snapshot['dates']   = snapshot_dates(table)
+                pass
+            write_snapshot(snapshot_path, snapshot)
+            if  storage != "objects":
+                return gedcom
+            pass
+        else:
+            buffer      = None
+            if  storage == "mmap":
+                buffer  = map_gedcom_file(filepath)[0]
+            table       = ElementTable.from_snapshot(snapshot, buffer)
+            cache       = current_date_cache() if date_cache is None else date_cache
+            for key, date in snapshot.get('dates', {}).items():
+                if  key not in cache:
+                    cache[key]  = date and a_date.from_tuple(date)
+                pass
+            pass
+        gedcom          = cls.__new__(cls)
+        if  storage == "objects":
+            gedcom.__setup()
+            gedcom.__load_elements(table)
+        else:
+            gedcom.__setup(table)
+        gedcom.encode   = snapshot['encode']
+        gedcom.__date_cache = date_cache
+        return gedcom
+
+    def date_cache(self):
+        """ Return the DateCache that this Gedcom's methods parse dates in to. """
+        return current_date_cache() if self.__date_cache is None else self.__date_cache
+
+    def element_list(self):
+        """ Return a list of all the elements in the Gedcom file.
+
+        By default elements are in the same order as they appeared in the file.
+        With columnar storage this is a read-only sequence of ElementView()s.
+        With lazy storage the whole file is parsed the first time this is called.
+        """
+        if  self.__element_list is None:
+            self.__element_list = self.__records.element_list()
+        return self.__element_list
+
+    def element_dict(self):
         """Return a dictionary of elements from the Gedcom file.
 
         Only elements identified by a pointer are listed in the dictionary.
         The keys for the dictionary are the pointers.
+        With columnar storage the values are ElementTable row ids.
         """
         return self.__element_dict
 
+    def element_table(self):
+        """ Return the ElementTable holding the file with columnar storage, or None. """
+        return self.__table
+
+    def record_index(self):
+        """ Return the RecordIndex of the file with lazy storage, or None. """
+        return self.__records
+
+    def get_element(self, pointer):
+        """ Return the element identified by the pointer, or None if there isn't one. """
+        if  self.__table is not None:
+            row = self.__table.pointers.get(pointer)
+            if  row is None:
+                return None
+            return ElementView(self.__table, row)
+        return self.__element_dict.get(pointer)
+
+    def relationship_graph(self, rebuild=False):
+        """
+            Return the RelationshipGraph of the file, building it the first time it's asked for.
+
+            families(), get_parents(), get_children(), get_spouses() and get_family_members() use it.
+            If elements are changed after it's built, build it again with rebuild=True.
+
+            With lazy storage, building it parses every record, so those methods
+            look through the records they're given instead, until something else
+            (like get_ancestors() or relationship()) has built it.
+
+        """
+        if  rebuild or (self.__graph is None):
+            self.__graph    = RelationshipGraph(self)
+        return self.__graph
+
+    def graph_elements(self, nodes):
+        """ Return the elements of the given RelationshipGraph node ids. """
+        pointers    = self.relationship_graph().pointers
+        get_element = self.get_element
+        return [ get_element(pointers[node]) for node in nodes ]
+
+    def graph_node(self, element):
+        """ Return the RelationshipGraph node id of the element, or None if it isn't one of the file's elements with a pointer. """
+        pointer = element.pointer()
+        if  pointer == "":
+            return None
+        node    = self.relationship_graph().ids.get(pointer)
+        if  (node is None) or (self.get_element(pointer) != element):
+            return None                         # an element from somewhere else, or one whose pointer is used again later in the file
+        return node
+
+    def __family_node(self, element):
+        """ Return graph_node() for families(), get_parents() and the like, or None if that would build the graph of a lazy file. """
+        if  (self.__records is not None) and (self.__graph is None):
+            return None
+        return self.graph_node(element)
+
+    def person_table(self, rebuild=False):
+        """
+            Return the PersonTable of the file's individuals, building it the first time it's asked for.
+
+            query(), find_names(), find_similar_names(), find_duplicates() and year_index() use it.
+            Elements don't tell the Gedcom when they're changed, so after changing or adding
+            an individual (with Element.add_child() or the like), call update_person() with it,
+            or build the whole table again with rebuild=True. Until then those methods go by
+            what the individual was.
+
+        """
+        if  rebuild or (self.__people is None):
+            if  self.__table is not None:
+                table   = self.__table
+                indi    = table.tag_id("INDI")
+                rows    = []
+                row     = 0 if len(table) else -1
+                while row >= 0:                 # the level 0 rows
+                    if  table.tag_ids[row] == indi:
+                        rows.append(row)
+                    row = table.next_siblings[row]
+                people  = [ ElementView(table, row) for row in rows ]
+            else:
+                people  = [ e for e in self.element_list() if (e.level() == 0) and e.is_individual() ]
+            with self.date_cache().use():
+                self.__people   = PersonTable(people)
+            self.__year_indexes = {}
+        return self.__people
+
+    def update_person(self, individual):
+        """
+            Bring person_table(), its name indexes and the year_index()es up to date after an individual has been changed or added to the file.
+
+            The individual's row is looked at again (or added, for a new
+            individual) and the NameIndexes and SimilarNameIndex are updated
+            in place. The year indexes are built again the next time they're
+            asked for.
+
+        """
+        if  not individual.is_individual():
+            raise ValueError("Operation only valid for elements with INDI tag.")
+        if  self.__people is None:
+            return                              # it'll be built as things are now, when it's asked for
+        people  = self.__people
+        row     = people.pointer_rows.get(individual.pointer())
+        with self.date_cache().use():
+            if  row is None:
+                people.add(individual)
+            else:
+                people.elements[row]    = individual
+                people.update(row)
+            pass
+        self.__year_indexes = {}
+
+    def query(self, criteria):
+        """
+            Return the individuals (level 0 INDI elements, in file order) that match the criteria, as Element.criteria_match() does.
+
+            The criteria string is compiled once by compile_criteria(). The
+            surname and name tests are looked up in the NameIndexes of
+            person_table() and the years are checked down its columns, so
+            names and dates aren't looked up and parsed again for each query.
+
+        """
+        tests   = compile_criteria(criteria)
+        if  tests is None:
+            return []
+        people  = self.person_table()
+        return [ people.elements[i] for i in people.select(tests) ]
+
+    def find_similar_names(self, name, k=10):
+        """
+            Return up to k ( score, individual, ) pairs of the individuals with names most like the name, best first.
+
+            The name can be a (given names, surname) tuple, as Element.name()
+            returns, a NAME value like "John /Smith/", or "John Smith".
+            Scores are str_ratio()s, worked out only for a shortlist of names
+            from the person_table()'s SimilarNameIndex.
+
+        """
+        return self.find_similar_names_batch([ name ], k)[0]
+
+    def find_similar_names_batch(self, names, k=10):
+        """ Return find_similar_names() of each of the names, using one SimilarNameIndex and looking up each different name once. """
+        people  = self.person_table()
+        index   = people.similar_name_index()
+        found   = {}
+        results = []
+        for name in names:
+            first, last = split_name(name)
+            if  ( first, last, ) not in found:
+                found[( first, last, )] = [ ( score, people.elements[row], ) for score, row in index.similar(first, last, k) ]
+            results.append(list(found[( first, last, )]))
+        return results
+
+    def find_duplicates(self, workers=None, min_score=0.75, anc_type="ALL"):
+        """
+            Return ( score, individual, individual, ) for each pair of individuals who look like the same person, best first.
+
+            People are compared with gedcom.duplicates.score_pair() only within
+            blocks of the same surname soundex() code and birth decade, and
+            people without a birth year with everyone of the same code. Their
+            names, birth and death dates, sexes and parents (natural parents
+            only if anc_type is "NAT") are looked at. With workers, the dates
+            are parsed, and the blocks scored, in a pool of that many processes.
+
+        """
+        from gedcom.duplicates import find_duplicates
+        people  = self.person_table()
+        graph   = self.relationship_graph()
+        parents = graph.natural_parents if anc_type == "NAT" else graph.parents
+        rows    = dict((e.pointer(), row) for row, e in enumerate(people.elements))
+        fields  = []
+        for row, element in enumerate(people.elements):
+            node    = self.graph_node(element)
+            nodes   = () if node is None else parents[node]
+            names   = []
+            for parent in nodes:
+                parent_row  = rows.get(graph.pointers[parent])
+                if  parent_row is None:
+                    first, last = self.get_element(graph.pointers[parent]).name()
+                else:
+                    first, last = people.given_names[parent_row], people.surnames[parent_row]
+                names.append(( first, last, ))
+            fields.append(( row, people.given_names[row], people.surnames[row], people.sexes[row], element.birth()[0], element.death()[0], tuple(nodes), tuple(names), ))   # duplicates.person_record() fields
+        with self.date_cache().use():
+            found   = find_duplicates(fields, workers, min_score)       # person_record()s, with their parsed dates, are made in the workers
+        elements    = people.elements
+        return [ ( score, elements[a], elements[b], ) for score, a, b in found ]
+
+    def year_index(self, slack=0, rebuild=False):
+        """
+            Return the YearIndex of everyone's birth, death and marriage dates with the given slack, building it the first time it's asked for.
+
+            The index is built in one pass over the individuals of
+            person_table(), and its rows are person_table() rows.
+            If elements are changed after it's built, build it again with rebuild=True.
+
+        """
+        index   = self.__year_indexes.get(slack)
+        if  rebuild or (index is None):
+            people  = self.person_table(rebuild)
+            index   = YearIndex(slack)
+            with self.date_cache().use():
+                for row, element in enumerate(people.elements):
+                    index.add("birth", row, element.birth_date())
+                    index.add("death", row, element.death_date())
+                    for date in self.marriage_dates(element):
+                        index.add("marriage", row, date)
+                    pass
+                pass
+            index.finish()
+            self.__year_indexes[slack]  = index
+        return index
+
+    def find_by_year(self, event, year1, year2, slack=0):
+        """
+            Return the individuals, in file order, with a birth, death or marriage (event) in the years year1 to year2, both included.
+
+            With slack=0, this is who birth_range_match(), death_range_match()
+            and marriage_range_match() match, except for people with no year.
+            With slack, "about", "before" and "after" dates take in slack years
+            around, before or after their year (see YearIndex).
+
+        """
+        people  = self.person_table()
+        return [ people.elements[row] for row in self.year_index(slack).between(event, year1, year2) ]
+
+    def find_names(self, text, column="surnames", match="substring"):
+        """
+            Return the individuals whose surnames (or given_names) have text in them, in file order.
+
+            match can be "substring", "exact" or "prefix". Lookups use the
+            person_table()'s NameIndex of the column and are case sensitive.
+
+        """
+        if  match not in ( "substring", "exact", "prefix", ):
+            raise ValueError("match must be one of: substring, exact, prefix")
+        people  = self.person_table()
+        index   = people.name_index(column)
+        rows    = { "substring": index.find, "exact": index.exact, "prefix": index.prefix, }[match](text)
+        return [ people.elements[i] for i in rows ]
+
     # Private methods
 
     def __parse(self, filepath,
@@ -631,37 +1914,79 @@ class Gedcom(object):
                       errors=None,
                       newline=None,
                       opener=None,
+                      storage=None,
                ):
         """Open and parse file path as GEDCOM 5.5 formatted data."""
-        if  sys.version_info[0] >= 3 :
-            gedcom_file = open(filepath,
-                               mode='rU',
-                               encoding=encoding,
-                               errors = errors,
-                               newline=None,        # github:rltest: \r\n is part of the gedcom 5.5 spec. bar: But be liberal in what we accept.
-                               opener=opener,
-                              )
-            pass
-        else:
-            gedcom_file = open(filepath, 'rU')
+        if  storage == "mmap":
+            self.__parse_mmap(filepath, encoding=encoding, errors=errors, opener=opener)
+            return
+        gedcom_file, self.encode = open_gedcom_file(filepath, encoding=encoding, errors=errors, opener=opener)
 
-        utf_hdr     = gedcom_file.read(1)
-        if  utf_hdr == '\ufeff':                    # python3
-            self.encode = 'utf8'                    # maybe we should do something with this, but if we're defaulting to utf8, it's hard to say what
+        line_num = 1
+        if  self.__table is not None:
+            self.__table.load_lines(gedcom_file)
         else:
-            utf_hdr    += gedcom_file.read(2)
-            if  utf_hdr == '\xef\xbb\xbf':          # python2
-                self.encode = 'utf8'
-            else:
-                gedcom_file.seek(0)                 # normal file
+            last_elem = self.__element_top
+            for line in gedcom_file:
+                last_elem = self.__parse_line(line_num, line, last_elem)
+                line_num += 1
+        gedcom_file.close()
+
+    def __parse_mmap(self, filepath, encoding=None, errors=None, opener=None):
+        """Memory-map the file and load it in to our ElementTable as bytes."""
+        buffer, start, self.encode = map_gedcom_file(filepath, opener=opener)
+        self.__table.load_bytes(buffer, encoding=encoding, errors=errors, start=start)
+
+    def __parse_parallel(self, filepath, workers, encoding=None, errors=None, storage=None):
+        """Parse the file in chunks of level 0 records in a pool of processes and put the chunks together in file order."""
+        encoding    = encoding or locale.getpreferredencoding(False)
+        check_ascii_compatible(encoding)
+        buffer, start, self.encode = map_gedcom_file(filepath)
+        jobs    = [ ( filepath, chunk_start, chunk_end, 1, encoding, errors, storage, ) for chunk_start, chunk_end in record_chunks(buffer, start, len(buffer), workers * 4) ]
+
+        table   = self.__table if self.__table is not None else ElementTable()
+        pool    = multiprocessing.Pool(workers)
+        try:
+            line_num    = 1
+            for job, done in zip(jobs, pool.imap(_parse_chunk, jobs)):
+                if  done is None:
+                    _parse_chunk(job[:3] + ( line_num, ) + job[4:], True)   # raise the error, this time with the right line number
+                chunk, lines    = done
+                table.append_table(chunk, job[1] if storage == "mmap" else None)
+                line_num       += lines
             pass
+        finally:
+            pool.terminate()
+            pool.join()
+        if  storage == "mmap":
+            table.buffer, table.encoding, table.errors  = buffer, encoding, errors
+        table.finish()
+        if  self.__table is None:
+            self.__load_elements(table)
+        pass
 
-        line_num = 1
-        last_elem = self.__element_top
-        for line in gedcom_file:
-            last_elem = self.__parse_line(line_num, line, last_elem)
-            line_num += 1
-        gedcom_file.close()
+    def __load_elements(self, table):
+        """Make our elements from the rows of an ElementTable, just as parsing the lines would have."""
+        top         = self.__element_top
+        elements    = self.__element_list
+        parents     = table.parents
+        if  self.__fold:
+            last_elem   = top
+            for row in range(len(table)):
+                last_elem   = self.__add_element(row + 1, ( table.levels[row], table.pointer(row), table.tag(row), table.value(row), table.crlf(row), ), last_elem)
+            return
+        for row in range(len(table)):
+            pointer     = table.pointer(row)
+            element     = Element(table.levels[row], pointer, table.tag(row), table.value(row), table.crlf(row))
+            parent      = parents[row]
+            parent_elem = top if parent < 0 else elements[parent]
+            parent_elem.add_child(element)
+            element.add_parent(parent_elem)
+            elements.append(element)
+            if  pointer != '':
+                self.__element_dict[pointer] = element
+            pass
+        pass
 
     def __parse_line(self, line_num, line, last_elem):
         """Parse a line from a GEDCOM 5.5 formatted document.
@@ -669,30 +1994,32 @@ class Gedcom(object):
         Each line should have the following (bracketed items optional):
         level + ' ' + [pointer + ' ' +] tag + [' ' + line_value]
         """
-        g   = ged_line_re.match(line)
-        if  g:
-            line_parts = g.groups()
-        elif not line.strip():
+        line_parts = parse_line_parts(line_num, line)
+        if  line_parts is None:
             return last_elem                    # allow blank lines
-        else:
-            errmsg = ("Line %d of document violates GEDCOM format" % line_num +
-                      "\nSee: http://homepages.rootsweb.ancestry.com/" +
-                      "~pmcbride/gedcom/55gctoc.htm")
-            raise SyntaxError(errmsg)
-
-        level   = int(line_parts[0])
-        pointer = line_parts[1].rstrip(' ')
-        tag     = line_parts[2]
-        value   = line_parts[3][1:]         # not .lstrip(' ') so CONC elements can have leading spaces so as not to need trailing spaces   - from github:mtdcr
-        crlf    = line_parts[4]             # github:mtdcr
+        return self.__add_element(line_num, line_parts, last_elem)
+
+    def __add_element(self, line_num, line_parts, last_elem):
+        """Add the element of a parsed line after last_elem, the element of the line before it. Return the element the next line comes after."""
+        level, pointer, tag, value, crlf = line_parts
+
+        if  self.__fold and last_elem.folded() and (not last_elem._children()):
+            # The line before was folded in to last_elem.
+            if  level > last_elem.level() + 1:
+                # This line is a child of the folded line, so make an element of the folded line after all.
+                folded  = last_elem.unfold()
+                self.__element_list.append(folded)
+                last_elem   = folded
+            elif (level == last_elem.level() + 1) and (tag in CONTINUATION_TAGS) and (pointer == ''):
+                last_elem.fold(tag, value, crlf)
+                return last_elem
+            pass
+        elif self.__fold and (level == last_elem.level() + 1) and (tag in CONTINUATION_TAGS) and (pointer == '') and (not last_elem._children()) and (last_elem is not self.__element_top):
+            last_elem.fold(tag, value, crlf)
+            return last_elem
 
         # Check level: should never be more than one higher than previous line.
-        if level > last_elem.level() + 1:
-            errmsg = ("Line %d of document violates GEDCOM format" % line_num +
-                      "\nLines must be no more than one level higher than " +
-                      "previous line.\nSee: http://homepages.rootsweb." +
-                      "ancestry.com/~pmcbride/gedcom/55gctoc.htm")
-            raise SyntaxError(errmsg)
+        check_line_level(line_num, level, last_elem.level())
 
         # Create element. Store in list and dict, create children and parents.
         element = Element(level, pointer, tag, value, crlf)
@@ -724,7 +2051,7 @@ class Gedcom(object):
             # print family[0].children()
             for famdata in family[0].children():
                 if famdata.tag() == "MARR" or famdata.tag() == 'DIV':
-                    for marrdata in famdata.children():
+                    for marrdata in famdata._children():
                         date = ''
                         place = ''
                         if marrdata.tag() == "DATE":
@@ -748,7 +2075,7 @@ class Gedcom(object):
         for family in fams_families:
             for famdata in family.children():
                 if famdata.tag() == "MARR":
-                    for marrdata in famdata.children():
+                    for marrdata in famdata._children():
                         date = ''
                         place = ''
                         if marrdata.tag() == "DATE":
@@ -760,14 +2087,14 @@ class Gedcom(object):
 
     def marriage_dates(self, individual):
         """ Return a_date() or None's for the person's marriage dates. """
-        return [ a_date.parse(dp[0]) for dp in self.marriages(individual) ]
+        marriages   = self.marriages(individual)
+        with self.date_cache().use():
+            return [ a_date.parse(dp[0]) for dp in marriages ]
 
     def marriage_years(self, individual):
         """ Return list of marriage years (as int) for an individual. """
-        marriages   = self.marriages(individual)
         dates       = []
-        for m in marriages :
-            d       = a_date.parse(m[0])
+        for d in self.marriage_dates(individual) :
             if  d and (d.year != None) :
                 dates.append(d.year)
             pass
@@ -798,28 +2125,156 @@ class Gedcom(object):
         """
         if not individual.is_individual():
             raise ValueError("Operation only valid for elements with INDI tag.")
+        if family_type in ( "FAMS", "FAMC", ):
+            node = self.__family_node(individual)
+            if node is not None:
+                graph = self.relationship_graph()
+                return self.graph_elements((graph.fams if family_type == "FAMS" else graph.famc)[node])
         families = []
         for child in individual.children():
-            is_fams = (child.tag() == family_type and
-                       child.value() in self.__element_dict and
-                       self.__element_dict[child.value()].is_family())
-            if is_fams:
-                families.append(self.__element_dict[child.value()])
+            if child.tag() == family_type:
+                family = self.get_element(child.value())
+                if family is not None and family.is_family():
+                    families.append(family)
         return families
 
-    def get_ancestors(self, indi, anc_type="ALL"):
+    def get_ancestors(self, indi, anc_type="ALL", natural_line=False):
         """ Return elements corresponding to ancestors of an individual
 
         Optional anc_type. Default "ALL" returns all ancestors, "NAT" can be
-        used to specify only natural (genetic) ancestors.
+        used to specify only natural (genetic) parents, followed by all of
+        their ancestors. With natural_line=True too, only natural parents
+        are followed, all the way up.
+        Parents come first, then each parent's ancestors. Each ancestor is
+        listed once, even if they're an ancestor more than one way.
+        """
+        if not indi.is_individual():
+            raise ValueError("Operation only valid for elements with INDI tag.")
+        natural = anc_type == "NAT"
+        closures = self.closures("NAT" if natural and natural_line else "ALL")
+        node = self.graph_node(indi)
+        if node is not None and (natural_line or not natural):
+            return self.graph_elements(closures.ancestors(node))
+        parents = [ self.graph_node(parent) for parent in self.get_parents(indi, anc_type) ]
+        ancestors = []
+        seen = set()
+        for node in parents + [ node for parent in parents for node in closures.ancestors(parent) ]:
+            if node not in seen:
+                seen.add(node)
+                ancestors.append(node)
+        return self.graph_elements(ancestors)
+
+    def get_descendants(self, indi, desc_type="ALL"):
+        """ Return elements corresponding to descendants of an individual: children first, then their descendants. Each is listed once.
+
+        Optional desc_type. Default "ALL" returns all descendants, "NAT" can be
+        used to specify only natural (genetic) descendants.
+        """
+        if not indi.is_individual():
+            raise ValueError("Operation only valid for elements with INDI tag.")
+        node = self.graph_node(indi)
+        if node is None:
+            return []
+        return self.graph_elements(self.closures(desc_type).descendants(node))
+
+    def iter_descendants(self, indi, max_depth=None, order="bfs", desc_type="ALL"):
+        """ Yield (descendant, generation, family) for the descendants of an individual, finding them only as they're asked for.
+
+        generation is 1 for children, 2 for grandchildren and so on, and
+        family is the FAM element the descendant is a child in. With
+        order="bfs" (breadth first) a generation comes before the next,
+        and with order="dfs" (depth first) a child's descendants come
+        before the next child. Each descendant is yielded once, the first
+        time they're found, so loops in the file don't go on for ever.
+        max_depth stops after that many generations. desc_type "NAT"
+        follows natural children only.
+        """
+        return self.__iter_relatives(indi, True, max_depth, order, desc_type == "NAT")
+
+    def iter_ancestors(self, indi, max_depth=None, order="bfs", anc_type="ALL"):
+        """ Yield (ancestor, generation, family) for the ancestors of an individual, as iter_descendants() does for descendants.
+
+        generation is 1 for parents, and family is the FAM element in which
+        the ancestor is a parent of the one before them. anc_type "NAT"
+        follows natural parents only.
         """
+        return self.__iter_relatives(indi, False, max_depth, order, anc_type == "NAT")
+
+    def __iter_relatives(self, indi, down, max_depth, order, natural):
         if not indi.is_individual():
             raise ValueError("Operation only valid for elements with INDI tag.")
-        parents = self.get_parents(indi, anc_type)
-        ancestors = parents
-        for parent in parents:
-            ancestors = ancestors + self.get_ancestors(parent)
-        return ancestors
+        if order not in ( "bfs", "dfs", ):
+            raise ValueError("order must be bfs or dfs")
+        graph = self.relationship_graph()
+        root = self.graph_node(indi)
+        first = None
+        if root is None:
+            # Not one of the file's elements with a pointer, so start from its parents, as get_ancestors() does.
+            # It can't be anyone's parent, so it has no descendants, as get_descendants() says.
+            parents = [] if down else [ self.graph_node(parent) for parent in self.get_parents(indi, "NAT" if natural else "ALL") ]
+            families = [ self.graph_node(family) for family in self.families(indi, "FAMC") ] if parents else []
+            first = [ ( parent, family, ) for family in families if family is not None for parent in graph.family_members(family, ( graph.HUSB, graph.WIFE, )) if parent in parents ]
+        return self.__walk_relatives(graph, root, first, down, max_depth, order, natural)
+
+    def __walk_relatives(self, graph, root, first, down, max_depth, order, natural):
+        """ The generator behind iter_descendants() and iter_ancestors(), kept apart so they check their arguments when they're called. """
+        natural_parents = graph.natural_parents
+        if down:
+            families, roles = graph.fams, ( graph.CHIL, )
+        else:
+            families, roles = graph.famc, ( graph.HUSB, graph.WIFE, )
+        def steps(node):
+            if node is None:
+                for step in first:
+                    yield step
+                return
+            for family in families[node]:
+                for member in graph.family_members(family, roles):
+                    if natural and not ((node in natural_parents[member]) if down else (member in natural_parents[node])):
+                        continue
+                    yield member, family
+                pass
+            pass
+        pointers = graph.pointers
+        get_element = self.get_element
+        seen = set([ root ])
+        if order == "bfs":
+            queue = collections.deque([ ( root, 0, ) ])
+            while queue:
+                node, generation = queue.popleft()
+                if (max_depth is not None) and (generation >= max_depth):
+                    continue
+                for member, family in steps(node):
+                    if member not in seen:
+                        seen.add(member)
+                        yield get_element(pointers[member]), generation + 1, get_element(pointers[family])
+                        queue.append(( member, generation + 1, ))
+                    pass
+                pass
+            return
+        stack = [ ( steps(root), 0, ) ] if (max_depth is None) or (max_depth > 0) else []
+        while stack:
+            members, generation = stack[-1]
+            for member, family in members:
+                if member not in seen:
+                    seen.add(member)
+                    yield get_element(pointers[member]), generation + 1, get_element(pointers[family])
+                    if (max_depth is None) or (generation + 1 < max_depth):
+                        stack.append(( steps(member), generation + 1, ))
+                    break
+                pass
+            else:
+                stack.pop()
+            pass
+        pass
+
+    def closures(self, anc_type="ALL"):
+        """ Return the memoizing Closures over relationship_graph(), following natural parents only if anc_type is "NAT". """
+        graph = self.relationship_graph()
+        natural = anc_type == "NAT"
+        if self.__closures.get(natural) is None or self.__closures[natural].graph is not graph:
+            self.__closures[natural] = Closures(graph, natural = natural)
+        return self.__closures[natural]
 
     def get_parents(self, indi, parent_type="ALL"):
         """ Return elements corresponding to parents of an individual
@@ -829,13 +2284,17 @@ class Gedcom(object):
         """
         if not indi.is_individual():
             raise ValueError("Operation only valid for elements with INDI tag.")
+        node = self.__family_node(indi)
+        if node is not None:
+            graph = self.relationship_graph()
+            return self.graph_elements((graph.natural_parents if parent_type == "NAT" else graph.parents)[node])
         parents = []
         famc_families = self.families(indi, "FAMC")
         for family in famc_families:
             if parent_type == "NAT":
                 for famrec in family.children():
                     if famrec.tag() == "CHIL" and famrec.value() == indi.pointer():
-                        for chilrec in famrec.children():
+                        for chilrec in famrec._children():
                             if chilrec.value() == "Natural":
                                 if chilrec.tag()   in [ "_MREL", "MREL", ]:             # github:d2po swapped M/F - checked against gramps exportgedcom.py code. bar: added non-underscore tags
                                     parents = (parents +
@@ -847,29 +2306,96 @@ class Gedcom(object):
                 parents = parents + self.get_family_members(family, "PARENTS")
         return parents
 
+    def get_spouses(self, indi):
+        """ Return array of the spouses of this person: the other HUSB and WIFE members of the person's FAMS families. """
+        if not indi.is_individual():
+            raise ValueError("Operation only valid for elements with INDI tag.")
+        node = self.__family_node(indi)
+        if node is not None:
+            return self.graph_elements(self.relationship_graph().spouses[node])
+        return [ spouse for fam in self.families(indi) for spouse in self.get_family_members(fam, "PARENTS") if spouse != indi ]
+
     def get_children(self, indi):
         """ Return array of children of this person. """
+        node            = self.__family_node(indi)
+        if  node is not None and indi.is_individual():
+            return self.graph_elements(self.relationship_graph().children[node])
         children        = []
         for fam in self.families(indi):
             children   += self.get_family_members(fam, mem_type = "CHIL")
         return children
 
-    def find_path_to_anc(self, desc, anc, path=None, anc_type="ALL"):
-        """ Return path from descendant to ancestor. """
+    def find_path_to_anc(self, desc, anc, path=None, anc_type="ALL", natural_line=False):
+        """ Return a shortest path from descendant to ancestor (path, if given, is put in front of it), or None if anc isn't an ancestor.
+
+        anc_type "NAT" follows natural parents of desc, then all parents of
+        theirs, as get_ancestors() does. natural_line=True follows natural
+        parents all the way up.
+        """
         if not desc.is_individual() and anc.is_individual():
             raise ValueError("Operation only valid for elements with IND tag.")
         if not path:
             path = [desc]
         if path[-1].pointer() == anc.pointer():
             return path
-        else:
-            parents = self.get_parents(desc, anc_type)
-            for par in parents:
-                potential_path = self.find_path_to_anc(par, anc, path + [par])
-                if potential_path:
-                    return potential_path
+        parents = self.closures("NAT" if anc_type == "NAT" and natural_line else "ALL").parents
+        came_from = {}
+        level = [ self.graph_node(parent) for parent in self.get_parents(desc, anc_type) ]
+        for node in level:
+            came_from.setdefault(node, None)
+        pointers = self.relationship_graph().pointers
+        while level:
+            next_level = []
+            for node in level:
+                if pointers[node] == anc.pointer():
+                    found = []
+                    while node is not None:
+                        found.append(node)
+                        node = came_from[node]
+                    return path + self.graph_elements(reversed(found))
+                for parent in parents[node]:
+                    if parent not in came_from:
+                        came_from[parent] = node
+                        next_level.append(parent)
+            level = next_level
         return None
 
+    def relationship_calculator(self, anc_type="ALL", spouses=False):
+        """ Return the gedcom.relationship.RelationshipCalculator over relationship_graph(), following natural parents only if anc_type is "NAT". """
+        from gedcom.relationship import RelationshipCalculator
+        graph = self.relationship_graph()
+        key = ( anc_type == "NAT", spouses, )
+        calculator = self.__calculators.get(key)
+        if calculator is None or calculator.graph is not graph:
+            calculator = self.__calculators[key] = RelationshipCalculator(graph, natural = key[0], spouses = spouses)
+        return calculator
+
+    def relationship(self, indi1, indi2, anc_type="ALL"):
+        """ Return a gedcom.relationship.Relationship telling how indi2 is related to indi1: their lowest common ancestors (as elements), and a label like "first cousin once removed". """
+        return self.relationships([ ( indi1, indi2, ) ], anc_type)[0]
+
+    def relationships(self, pairs, anc_type="ALL"):
+        """ Return the relationship() of each (indi1, indi2) in pairs. Each person's ancestors are looked up only once for the whole batch. """
+        nodes = [ ( self.__individual_node(indi1), self.__individual_node(indi2), ) for indi1, indi2 in pairs ]
+        results = self.relationship_calculator(anc_type).relationships(nodes)
+        for result, ( indi1, indi2, ) in zip(results, pairs):
+            result.a, result.b = indi1, indi2
+            result.common_ancestors = self.graph_elements(result.common_ancestors)
+        return results
+
+    def shortest_path(self, indi1, indi2, anc_type="ALL", spouses=False):
+        """ Return the elements of a shortest path between two individuals over parent and child (and, with spouses=True, spouse) links, or None. """
+        path = self.relationship_calculator(anc_type, spouses).shortest_path(self.__individual_node(indi1), self.__individual_node(indi2))
+        return None if path is None else self.graph_elements(path)
+
+    def __individual_node(self, indi):
+        if not indi.is_individual():
+            raise ValueError("Operation only valid for elements with INDI tag.")
+        node = self.graph_node(indi)
+        if node is None:
+            raise ValueError("The individual isn't one of this file's elements.")
+        return node
+
     def get_family_members(self, family, mem_type="ALL"):
         """Return array of family members: individual, spouse, and children.
 
@@ -882,6 +2408,16 @@ class Gedcom(object):
         """
         if not family.is_family():
             raise ValueError("Operation only valid for elements with FAM tag.")
+        node = self.__family_node(family)
+        if node is not None:
+            graph = self.relationship_graph()
+            roles = {
+                        "PARENTS":  ( graph.HUSB, graph.WIFE, ),
+                        "HUSB":     ( graph.HUSB, ),
+                        "WIFE":     ( graph.WIFE, ),
+                        "CHIL":     ( graph.CHIL, ),
+                    }.get(mem_type, ( graph.HUSB, graph.WIFE, graph.CHIL, ))
+            return self.graph_elements(graph.family_members(node, roles))
         family_members = [ ]
         for elem in family.children():
             # Default is ALL
@@ -897,8 +2433,10 @@ class Gedcom(object):
                 is_family = (elem.tag() == "WIFE")
             elif mem_type == "CHIL":
                 is_family = (elem.tag() == "CHIL")
-            if is_family and elem.value() in self.__element_dict:
-                family_members.append(self.__element_dict[elem.value()])
+            if is_family:
+                member = self.get_element(elem.value())
+                if member is not None:
+                    family_members.append(member)
         return family_members
 
     # Other methods
@@ -906,8 +2444,12 @@ class Gedcom(object):
     def print_gedcom(self, file=None, flush=False):     # file+flush are p2 compat version of github:rltest changes
         """Write GEDCOM data to stdout."""
         file    = file or sys.stdout
-        for element in self.element_list():
-            file.write(str(element))
+        if  self.__table is not None:
+            lines   = self.__table.iter_lines()
+        else:
+            lines   = (str(element) for element in self.element_list())
+        for line in lines:
+            file.write(line)
             if  flush:
                 file.flush()                            # this can keep tail up to date, eh?
             pass
@@ -920,8 +2462,116 @@ class Gedcom(object):
             python(3) -c "import sys;sys.path.append('python-gedcom');import gedcom as g;g.Gedcom('GEDcom_file.ged').print_dates()"
 
         """
-        for element in self.element_list():
-            element.print_dates()
+        with self.date_cache().use():
+            if  self.__table is not None:
+                self.__table.print_dates()
+                return
+            for element in self.element_list():
+                element.print_dates()
+            pass
+        pass
+
+    def parse_all_dates(self, workers=None):
+        """
+            Parse all the DATE values in one go and return them in columns, one entry for each DATE line, in file order.
+
+            The values are parsed the way print_dates() parses them: with
+            a_date.parse_death_date() under DEAT and BURI, and a_date.parse()
+            everywhere else. Each different value is parsed once, in a pool
+            of that many processes if workers is more than 1, and the dates
+            are put in date_cache(), so birth_year() and the like find them
+            there afterward. Values already in date_cache() aren't parsed again.
+
+            Return a dict of numpy arrays (array.array()s if numpy isn't installed):
+
+            rows    - the DATE line's index in element_list()
+            records - the element_list() index of the level 0 record the line is in
+            years   - the year, -1 if there isn't one
+            months  - the month, 1..12, 0 if there isn't one
+            days    - the day, 1..31, 0 if there isn't one
+            abouts, befores, afters - 1 if the date is "about", "before" or "after", 0 if not
+            keys    - the date's a_date.key(), NO_DATE_KEY if the value isn't a date
+
+        """
+        cache   = self.date_cache()
+        rows    = array.array('i')
+        records = array.array('i')
+        keys    = []
+        for row, record, value, death in self.__iter_date_values():
+            rows.append(row)
+            records.append(record)
+            keys.append(death_key(value) if death else value)
+        dates   = {}
+        todo    = []
+        for key in keys:
+            if  key not in dates:
+                date        = cache.get(key, _MISSING)
+                if  date is _MISSING:
+                    todo.append(key)
+                    date    = None
+                dates[key]  = date and date.to_tuple()
+            pass
+        if  workers and (workers > 1) and (len(todo) > 1):
+            size    = max(1, -(-len(todo) // (workers * 4)))
+            jobs    = [ todo[i:i + size] for i in range(0, len(todo), size) ]
+            pool    = multiprocessing.Pool(workers)
+            try:
+                done    = pool.map(_parse_dates, jobs)
+            finally:
+                pool.terminate()
+                pool.join()
+            for job, parsed in zip(jobs, done):
+                for key, date in zip(job, parsed):
+                    dates[key]  = date
+                    cache.put(key, date and a_date.from_tuple(date))
+                pass
+            pass
+        else:
+            with cache.use():
+                for key, date in zip(todo, _parse_dates(todo)):
+                    dates[key]  = date
+                pass
+            pass
+        columns = dict(( name, array.array(typecode), ) for name, typecode in ( ( 'years', 'i', ), ( 'months', 'b', ), ( 'days', 'b', ), ( 'abouts', 'b', ), ( 'befores', 'b', ), ( 'afters', 'b', ), ( 'keys', 'i', ), ))
+        for key in keys:
+            year, month, day, about, before, after  = dates[key] or ( None, None, None, False, False, False, )
+            columns['years'].append(-1 if year is None else year)
+            columns['months'].append(month or 0)
+            columns['days'].append(day or 0)
+            columns['abouts'].append(1 if about else 0)
+            columns['befores'].append(1 if before else 0)
+            columns['afters'].append(1 if after else 0)
+            columns['keys'].append(NO_DATE_KEY if dates[key] is None else a_date.from_tuple(dates[key]).key())
+        columns['rows']     = rows
+        columns['records']  = records
+        if  numpy is not None:
+            columns = dict(( name, numpy.frombuffer(column, dtype = numpy.dtype(column.typecode)), ) for name, column in columns.items())
+        return columns
+
+    def __iter_date_values(self):
+        """ Yield (element_list() index, level 0 record's index, value, True if parsed as a death date) for each DATE line under a level 0 line, as ElementTable.iter_dates() does. """
+        if  self.__table is not None:
+            table   = self.__table
+            for row, record, parse_rtn in table.iter_dates():
+                yield row, record, table.value(row), parse_rtn == a_date.parse_death_date
+            return
+        record  = -1
+        deaths  = [ None, None, ]                   # whether the DATEs at each level are parsed as death dates, None if no DATE has been parsed yet (see Element._print_dates())
+        for row, element in enumerate(self.element_list()):
+            level   = element.level()
+            tag     = element.tag()
+            if  level == 0:
+                record      = row
+                deaths[1]   = None
+                continue
+            death   = deaths[level]
+            if  tag == "DATE":
+                if  death is None:
+                    death   = deaths[level] = False
+                yield row, record, element.value(), death
+            if  len(deaths) <= level + 1:
+                deaths.append(None)
+            deaths[level + 1]   = death if death is not None else (True if tag in ( "DEAT", "BURI", ) else None)
         pass
 
 
@@ -936,6 +2586,30 @@ class GedcomParseError(Exception):
     def __str__(self):
         return repr(self.value)
 
+_NO_CHILDREN    = ()            # shared by all the leaf elements, which are most of any file
+
+CONTINUATION_TAGS       = frozenset([ "CONC", "CONT", ])
+TAG_INDEX_MIN_CHILDREN  = 8             # Element.children_with_tag() indexes elements with at least this many children
+
+
+def join_continuations(value, folds, children):
+    """ Return the value joined with the values of the folded (tag, value, crlf)s and the CONC and CONT children. """
+    parts   = [ value ]
+    for tag, v, crlf in folds:
+        if  tag == "CONT":
+            parts.append("\n")
+        parts.append(v)
+    for e in children:
+        tag = e.tag()
+        if  tag == "CONC":
+            parts.append(e.value())
+        elif tag == "CONT":
+            parts.append("\n")
+            parts.append(e.value())
+        pass
+    return "".join(parts)
+
+
 class Element(object):
     """ Gedcom element
 
@@ -961,8 +2635,20 @@ class Element(object):
 
     See a Gedcom file for examples of tags and their values.
 
+    Elements use __slots__ to keep big files small in memory. Tags,
+    pointers and line endings are interned, and elements without
+    children share one empty children tuple until a child is added or
+    children() is asked for the list.
+
+    Long values are continued on CONC and CONT lines below them.
+    full_value() puts the pieces back together. Gedcom() can also fold
+    the continuation lines in to the element instead of making them
+    elements of their own (see fold()).
+
     """
 
+    __slots__ = ('__level', '__pointer', '__tag', '__value', '__crlf', '__children', '__parent', '__folds', '__full_value', '__tag_index', )
+
     def __init__(self, level, pointer, tag, value, crlf=None):
         """ Initialize an element.
 
@@ -971,13 +2657,17 @@ class Element(object):
         """
         # basic element info
         self.__level = level
-        self.__pointer = pointer
-        self.__tag = tag
+        self.__pointer = intern(pointer)
+        self.__tag = intern(tag)
         self.__value = value
-        self.__crlf = crlf or "\n"
+        self.__crlf = intern(crlf or "\n")
         # structuring
-        self.__children = []
+        self.__children = _NO_CHILDREN
         self.__parent = None
+        # continuation lines
+        self.__folds = _NO_CHILDREN
+        self.__full_value = None
+        self.__tag_index = None
 
     def level(self):
         """ Return the level of this element """
@@ -996,7 +2686,13 @@ class Element(object):
         return self.__value
 
     def children(self):
-        """ Return the child elements of this element """
+        """ Return the list of child elements of this element """
+        if  self.__children is _NO_CHILDREN:
+            self.__children = []                # a list of its own, now that someone might add to it
+        return self.__children
+
+    def _children(self):
+        """ Return the child elements, without giving a leaf a list of its own, for walking the tree """
         return self.__children
 
     def parent(self):
@@ -1005,12 +2701,104 @@ class Element(object):
 
     def add_child(self,element):
         """ Add a child element to this element """
-        self.children().append(element)
+        if  self.__children is _NO_CHILDREN:
+            self.__children = [ element ]
+        else:
+            self.__children.append(element)
+        self.__full_value = None
+        index   = self.__tag_index
+        if  index is not None and index[None] == len(self.__children) - 1:
+            self.__index_child(index, element.tag(), index[None])
+            index[None] = len(self.__children)
+        pass
 
     def add_parent(self,element):
         """ Add a parent element to this element """
         self.__parent = element
 
+    def children_with_tag(self, tag):
+        """
+            Return the child elements with the given tag, in order.
+
+            The children of an element with more than a few of them are
+            indexed by tag the first time this is called, so asking for
+            several tags doesn't look through all the children each time.
+            add_child() keeps the index up to date. The index remembers how
+            many children it has, under None, and is made again if the list
+            from children() has been changed to have a different number.
+
+        """
+        index   = self.__tag_index
+        if  index is None or index[None] != len(self.__children):
+            children    = self.__children
+            if  len(children) < TAG_INDEX_MIN_CHILDREN:
+                self.__tag_index = None
+                return [ e for e in children if e.__tag == tag ]    # quicker than indexing a few children
+            index   = {}
+            for i, e in enumerate(children):
+                self.__index_child(index, e.__tag, i)
+            index[None] = len(children)
+            self.__tag_index = index
+        found   = index.get(tag) if tag is not None else None
+        if  found is None:
+            return []
+        if  found.__class__ is int:
+            return [ self.__children[found] ]
+        children    = self.__children
+        return [ children[i] for i in found ]
+
+    @staticmethod
+    def __index_child(index, tag, i):
+        """
+            Add child number i to the tag index.
+
+            The index holds child numbers, not elements, and most tags are on just one child, so
+            it's a dict of ints and tuples of ints that the garbage collector doesn't need to look in.
+
+        """
+        found   = index.get(tag)
+        if  found is None:
+            index[tag]  = i
+        elif found.__class__ is int:
+            index[tag]  = ( found, i, )
+        else:
+            index[tag]  = found + ( i, )
+        pass
+
+    def full_value(self):
+        """
+            Return the value of this element with the values of its CONC and CONT lines joined on to it.
+
+            CONC values are joined on as they are. CONT values start a new line.
+            The joined value is kept, with how many children there were, so
+            adding a child with add_child() or to the list from children() makes a new one.
+
+        """
+        cached  = self.__full_value
+        if  cached is None or cached[0] != len(self.__children):
+            if  not ( self.__folds or self.__children ):
+                return self.__value
+            cached  = self.__full_value = ( len(self.__children), join_continuations(self.__value, self.__folds, self.__children), )
+        return cached[1]
+
+    def folded(self):
+        """ Return the (tag, value, crlf)s of the continuation lines folded in to this element """
+        return self.__folds
+
+    def fold(self, tag, value, crlf=None):
+        """ Fold a CONC or CONT line in to this element. It's printed with the element and isn't a child of it. """
+        self.__folds = self.__folds + ( ( intern(tag), value, intern(crlf or "\n"), ), )
+        self.__full_value = None
+
+    def unfold(self):
+        """ Make an element of the last folded continuation line and add it as the first child of this element. Return it. """
+        tag, value, crlf = self.__folds[-1]
+        self.__folds = self.__folds[:-1]
+        element = Element(self.__level + 1, "", tag, value, crlf)
+        self.add_child(element)
+        element.add_parent(self)
+        return element
+
     def is_individual(self):
         """ Check if this element is an individual """
         return self.tag() == "INDI"
@@ -1138,60 +2926,61 @@ class Element(object):
         first = ""
         last = ""
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "NAME":
-                    # some older Gedcom files don't use child tags but instead
-                    # place the name in the value of the NAME tag
-                    for c in e.children():
-                        if c.tag() == "GIVN":
-                            first = c.value().strip()
-                        if c.tag() == "SURN":
-                            last = c.value().strip()
-                    if  (not first) and (not last):
-                        if e.value().strip() != "":
-                            name = e.value().split('/')
-                            if len(name) > 0:
-                                first = name[0].strip()
-                                if len(name) > 1:
-                                    last = name[1].strip()
+            for e in self.children_with_tag("NAME"):
+                # some older Gedcom files don't use child tags but instead
+                # place the name in the value of the NAME tag
+                givns = e.children_with_tag("GIVN")
+                if givns:
+                    first = givns[-1].value().strip()
+                surns = e.children_with_tag("SURN")
+                if surns:
+                    last = surns[-1].value().strip()
+                if  (not first) and (not last):
+                    if e.value().strip() != "":
+                        name = e.value().split('/')
+                        if len(name) > 0:
+                            first = name[0].strip()
+                            if len(name) > 1:
+                                last = name[1].strip()
         return (first,last)
 
     def gender(self):
         """ Return the gender of a person in string format """
         gender = ""
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "SEX":
-                    gender = e.value().strip()
-                    break
+            for e in self.children_with_tag("SEX"):
+                gender = e.value().strip()
+                break
         return gender
 
     def private(self):
         """ Return if the person is marked private in boolean format """
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "PRIV":
-                    if  e.value().strip() == 'Y':
-                        return True
+            for e in self.children_with_tag("PRIV"):
+                if  e.value().strip() == 'Y':
+                    return True
         return False
 
-    def birth(self):
-        """ Return the birth tuple of a person as (date,place,source) """
+    def __event(self, tag):
+        """ Return (date,place,source) from the children of the person's event elements with the given tag """
         date = ""
         place = ""
         source = ()
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "BIRT":
-                    for c in e.children():
-                        if c.tag() == "DATE":
-                            date = c.value()
-                        if c.tag() == "PLAC":
-                            place = c.value()
-                        if c.tag() == "SOUR":
-                            source = source + (c.value(),)
+            for e in self.children_with_tag(tag):
+                for c in e.children():
+                    if c.tag() == "DATE":
+                        date = c.value()
+                    if c.tag() == "PLAC":
+                        place = c.value()
+                    if c.tag() == "SOUR":
+                        source = source + (c.value(),)
         return (date,place,source)          # note: the file could make this return value a mish-mash
 
+    def birth(self):
+        """ Return the birth tuple of a person as (date,place,source) """
+        return self.__event("BIRT")
+
     def birth_date(self):
         """ Return a_date() or None for the person's birth date. """
         return a_date.parse(self.birth()[0])
@@ -1205,20 +2994,7 @@ class Element(object):
 
     def death(self):
         """ Return the death tuple of a person as (date,place,source) """
-        date = ""
-        place = ""
-        source = ()
-        if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "DEAT":
-                    for c in e.children():
-                        if c.tag() == "DATE":
-                            date = c.value()
-                        if c.tag() == "PLAC":
-                            place = c.value()
-                        if c.tag() == "SOUR":
-                            source = source + (c.value(),)
-        return (date,place,source)
+        return self.__event("DEAT")
 
     def death_date(self):
         """ Return a_date() or None for the person's death date. """
@@ -1233,20 +3009,7 @@ class Element(object):
 
     def burial(self):
         """ Return the burial tuple of a person as (date,place,source) """
-        date = ""
-        place = ""
-        source = ()
-        if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "BURI":
-                    for c in e.children():
-                        if c.tag() == "DATE":
-                            date = c.value()
-                        if c.tag() == "PLAC":
-                            place = c.value()
-                        if c.tag() == "SOUR":
-                            source = source + (c.value(),)
-        return (date,place,source)
+        return self.__event("BURI")
 
     def burial_date(self):
         """ Return a_date() or None for the person's burial date. """
@@ -1257,19 +3020,18 @@ class Element(object):
         census = []
         if not self.is_individual():
             raise ValueError("Operation only valid for elements with INDI tag")
-        for pdata in self.children():
-            if pdata.tag() == "CENS":
-                date = ''
-                place = ''
-                source = ''
-                for indivdata in pdata.children():
-                    if indivdata.tag() == "DATE":
-                        date = indivdata.value()
-                    if indivdata.tag() == "PLAC":
-                        place = indivdata.value()
-                    if indivdata.tag() == "SOUR":
-                        source = source + (indivdata.value(),)
-                census.append((date, place, source))
+        for pdata in self.children_with_tag("CENS"):
+            date = ''
+            place = ''
+            source = ''
+            for indivdata in pdata.children():
+                if indivdata.tag() == "DATE":
+                    date = indivdata.value()
+                if indivdata.tag() == "PLAC":
+                    place = indivdata.value()
+                if indivdata.tag() == "SOUR":
+                    source = source + (indivdata.value(),)
+            census.append((date, place, source))
         return census
 
     def census_dates(self):
@@ -1280,11 +3042,9 @@ class Element(object):
         """ Return the last updated date of a person as date string """
         date = ""
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "CHAN":
-                    for c in e.children():
-                        if c.tag() == "DATE":
-                            date    = c.value().strip()
+            for e in self.children_with_tag("CHAN"):
+                for c in e.children_with_tag("DATE"):
+                    date    = c.value().strip()
         return date
 
     def last_updated_date(self):
@@ -1295,17 +3055,15 @@ class Element(object):
         """ Return the occupation of a person as a string. """
         occupation = ""
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "OCCU":
-                    occupation = e.value().strip()
+            for e in self.children_with_tag("OCCU"):
+                occupation = e.value().strip()
         return occupation
 
     def deceased(self):
         """ Check if a person is deceased """
         if  self.is_individual():
-            for e in self.children():
-                if e.tag() == "DEAT":
-                    return True
+            if  self.children_with_tag("DEAT"):
+                return True
         return False
 
 
@@ -1316,7 +3074,7 @@ class Element(object):
             Return [] if the tag is not found.
 
         """
-        return list(e.value() for e in self.children() if e.tag() == tag)
+        return list(e.value() for e in self.children_with_tag(tag))
 
 
     def get_string_value(self, tag):
@@ -1327,9 +3085,8 @@ class Element(object):
 
         """
         if  self.is_individual():
-            for e in self.children():
-                if  e.tag() == tag:
-                    return e.value()
+            for e in self.children_with_tag(tag):
+                return e.value()
         return ""
 
 
@@ -1356,7 +3113,7 @@ class Element(object):
     def get_individual(self):
         """ Return this element and all of its sub-elements """
         result = str(self)
-        for e in self.children():
+        for e in self.__children:
             result += e.get_individual()
         return result
 
@@ -1369,12 +3126,14 @@ class Element(object):
         if self.value()   != "":
             result += ' '  + self.value()
         result     += self.__crlf
+        for tag, value, crlf in self.__folds:
+            result += "%d %s%s%s" % ( self.level() + 1, tag, value and (' ' + value), crlf, )
         return result
 
     def _print_dates(self, ident = None, parse_rtn = None):
         """ Help with testing by printing all the dates we know for ourself. """
         ident   = ident or self.family_search_id() or self.afn() or self.mh_rin() or self.uid() or self.user_ref_num() or self.pointer()
-        for e in self.children():
+        for e in self.__children:
             if  e.tag() == "DATE" :
                 parse_rtn   = parse_rtn or a_date.parse
                 print("%s %-*s %-32s %s" % ( " " * e.level(), 18 - e.level(), ident[:12], e.value(), str(parse_rtn(e.value())), ))
@@ -1387,6 +3146,1675 @@ class Element(object):
         pass
 
 
+try :
+    _OFFSET_TYPECODE    = 'q'
+    array.array(_OFFSET_TYPECODE)
+except ValueError :
+    _OFFSET_TYPECODE    = 'l'                       # python2 has no 'q'
+
+
+def map_gedcom_file(filepath, opener=None):
+    """
+        Memory-map a GEDCOM file.
+
+        Return (map, start, encode), where start is 3 and encode is 'utf8' if the file
+        has a UTF-8 byte order mark, and they're 0 and '' otherwise.
+
+    """
+    if  opener is not None:
+        gedcom_file = open(filepath, 'rb', opener=opener)
+    else:
+        gedcom_file = open(filepath, 'rb')
+    try:
+        try:
+            buffer  = mmap.mmap(gedcom_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            buffer  = b''                               # empty files can't be mapped
+        pass
+    finally:
+        gedcom_file.close()                             # the map keeps its own handle on the file
+    if  buffer[:3] == b'\xef\xbb\xbf':
+        return buffer, 3, 'utf8'
+    return buffer, 0, ''
+
+
+def check_ascii_compatible(encoding):
+    """ Raise ValueError unless GEDCOM's level/pointer/tag characters and line ends are the same bytes in the encoding as in ASCII. """
+    if  u"0 @_Az9\r\n".encode(encoding) != b"0 @_Az9\r\n":
+        raise ValueError("GEDCOM files can only be split as bytes in ASCII compatible encodings, not " + encoding)
+    pass
+
+
+def record_chunks(buffer, start, end, chunks):
+    """ Return up to the given number of (start, end) ranges of buffer[start:end] that each begin with a level 0 line. """
+    bounds  = [ start ]
+    size    = (end - start) // max(chunks, 1)
+    for chunk in range(1, chunks):
+        at  = buffer.find(b'\n0 ', max(bounds[-1], start + chunk * size - 1), end)
+        if  at < 0:
+            break
+        bounds.append(at + 1)
+    bounds.append(end)
+    return [ ( chunk_start, chunk_end, ) for chunk_start, chunk_end in zip(bounds[:-1], bounds[1:]) if chunk_end > chunk_start ]
+
+
+def _parse_chunk(job, raise_errors=False):
+    """
+        Parse a chunk of a GEDCOM file in to an ElementTable, for Gedcom(workers = N).
+
+        Return (table, number of lines in the chunk), or None if the chunk has a syntax error
+        (the caller doesn't know the chunk's first line number - it finds the error again with it).
+
+    """
+    filepath, start, end, line_num, encoding, errors, storage = job
+    gedcom_file = open(filepath, 'rb')
+    try:
+        gedcom_file.seek(start)
+        data    = gedcom_file.read(end - start)
+    finally:
+        gedcom_file.close()
+    table   = ElementTable()
+    try:
+        if  storage == "mmap":
+            lines           = table.load_bytes(data, encoding=encoding, errors=errors, line_num=line_num) - line_num
+            table.buffer    = b''           # the values are sliced from the whole file's map
+        else:
+            lines           = table.load_lines(io.TextIOWrapper(io.BytesIO(data), encoding=encoding, errors=errors, newline=None), line_num) - line_num
+        pass
+    except SyntaxError:
+        if  raise_errors:
+            raise
+        return None
+    return table, lines
+
+
+SNAPSHOT_VERSION    = 2
+_SNAPSHOT_MAGIC     = b'GEDSNAP\n'
+_TABLE_ARRAYS       = ( 'levels', 'tag_ids', 'parents', 'first_children', 'next_siblings', 'value_starts', 'value_ends', 'crlf_ids', )
+
+
+def file_sha1(filepath):
+    """ Return the hex SHA-1 hash of a file's contents. """
+    sha1        = hashlib.sha1()
+    gedcom_file = open(filepath, 'rb')
+    try:
+        for block in iter(lambda : gedcom_file.read(1 << 20), b''):
+            sha1.update(block)
+        pass
+    finally:
+        gedcom_file.close()
+    return sha1.hexdigest()
+
+
+def read_snapshot(snapshot_path, source):
+    """ Return the snapshot dict in the file, or None if there isn't one or it isn't of the given source. """
+    try:
+        snapshot_file   = open(snapshot_path, 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        if  snapshot_file.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+            return None
+        snapshot        = marshal.load(snapshot_file)
+    except (EOFError, ValueError, TypeError):
+        return None                                 # truncated or from a different python
+    finally:
+        snapshot_file.close()
+    if  (not isinstance(snapshot, dict)) or (snapshot.get('version') != SNAPSHOT_VERSION) or (snapshot.get('byteorder') != sys.byteorder):
+        return None
+    for name in _TABLE_ARRAYS:
+        typecode, itemsize, data    = snapshot[name]
+        if  array.array(typecode).itemsize != itemsize:
+            return None
+        pass
+    if  snapshot.get('source') != source:
+        return None
+    return snapshot
+
+
+def write_snapshot(snapshot_path, snapshot):
+    """ Write the snapshot dict to the file, replacing the file in one go so readers never see half of it. """
+    cache_dir   = os.path.dirname(snapshot_path)
+    if  cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    temp_path   = "%s.%d.tmp" % ( snapshot_path, os.getpid(), )
+    snapshot_file   = open(temp_path, 'wb')
+    try:
+        snapshot_file.write(_SNAPSHOT_MAGIC)
+        marshal.dump(snapshot, snapshot_file)
+    finally:
+        snapshot_file.close()
+    try:
+        os.replace(temp_path, snapshot_path)
+    except AttributeError:
+        if  os.path.exists(snapshot_path):          # python2 can't rename over a file on Windows
+            os.remove(snapshot_path)
+        os.rename(temp_path, snapshot_path)
+    pass
+
+
+def snapshot_dates(table):
+    """ Return { DateCache key : a_date.to_tuple() or None } for all the table's DATE values, parsed the way print_dates() parses them. """
+    dates   = {}
+    for row, record, parse_rtn in table.iter_dates():
+        d   = table.value(row)
+        key = death_key(d) if parse_rtn == a_date.parse_death_date else d
+        if  key not in dates:
+            date        = parse_rtn(d)
+            dates[key]  = date and date.to_tuple()
+        pass
+    return dates
+
+
+def _parse_dates(keys):
+    """ Return a_date.to_tuple() or None for each DateCache key, for Gedcom.parse_all_dates(): a_date.parse() for date strings, a_date.parse_death_date() for death_key()s. """
+    results = []
+    for key in keys:
+        date    = a_date.parse_death_date(key[1]) if isinstance(key, tuple) else a_date.parse(key)
+        results.append(date and date.to_tuple())
+    return results
+
+
+_TAG_BYTES      = (string.ascii_letters + string.digits + '_').encode('ascii')
+
+
+class ElementTable(object):
+    """ Columnar (struct-of-arrays) storage for the lines of a GEDCOM file
+
+    Row i of the table holds the i'th (non-blank) line of the file in
+    parallel arrays:
+
+    levels          - the line's level
+    tag_ids         - index in to tags
+    parents         - row of the parent line, or -1 for level 0
+    first_children  - row of the first child line, or -1
+    next_siblings   - row of the next line with the same parent, or -1
+                      (level 0 rows are siblings of each other)
+    value_starts    - where the line's value starts in buffer
+    value_ends      - where the line's value ends in buffer
+    crlf_ids        - index in to crlfs
+
+    pointers maps each pointer to its row (the same way
+    Gedcom.element_dict() maps pointers to elements) and row_pointers
+    maps rows back to their pointers.
+
+    Rows are appended in file order by append(). Call finish() when done.
+    """
+
+    def __init__(self):
+        self.levels         = array.array('i')
+        self.tag_ids        = array.array('i')
+        self.parents        = array.array('i')
+        self.first_children = array.array('i')
+        self.next_siblings  = array.array('i')
+        self.value_starts   = array.array(_OFFSET_TYPECODE)
+        self.value_ends     = array.array(_OFFSET_TYPECODE)
+        self.crlf_ids       = array.array('B')
+        self.tags           = []
+        self.crlfs          = []
+        self.pointers       = {}
+        self.row_pointers   = {}
+        self.buffer         = ''
+        self.encoding       = None                  # set if buffer holds bytes that values are decoded from
+        self.errors         = None
+        self.__tag_ids      = {}
+        self.__crlf_ids     = {}
+        self.__values       = []
+        self.__value_end    = 0
+        self.__open_rows    = []                    # the last row at each level on the way down to the last row appended
+
+    def __len__(self):
+        return len(self.levels)
+
+    def last_level(self):
+        """ Return the level of the last row appended, or -1 if there is none. """
+        return len(self.__open_rows) - 1
+
+    def tag_id(self, tag):
+        """ Return the id of the tag, or -1 if no row has the tag. """
+        return self.__tag_ids.get(tag, -1)
+
+    def append(self, level, pointer, tag, value, crlf):
+        """ Add a line to the table. The caller checks the level. Return the new row. """
+        row         = len(self.levels)
+        open_rows   = self.__open_rows
+        parent      = open_rows[level - 1] if level > 0 else -1
+        if  len(open_rows) > level:
+            self.next_siblings[open_rows[level]] = row
+            del open_rows[level:]
+        elif parent >= 0:
+            self.first_children[parent] = row
+        open_rows.append(row)
+
+        tag_id      = self.__tag_id(tag)
+        crlf_id     = self.__crlf_id(crlf or "\n")
+
+        self.levels.append(level)
+        self.tag_ids.append(tag_id)
+        self.parents.append(parent)
+        self.first_children.append(-1)
+        self.next_siblings.append(-1)
+        self.crlf_ids.append(crlf_id)
+        self.value_starts.append(self.__value_end)
+        self.__value_end   += len(value)
+        self.value_ends.append(self.__value_end)
+        self.__values.append(value)
+        if  pointer != '':
+            self.pointers[pointer]  = row
+            self.row_pointers[row]  = intern(pointer)
+        return row
+
+    def finish(self):
+        """ Join the appended values in to the one buffer they're sliced from. """
+        if  self.__values:
+            self.buffer    += "".join(self.__values)
+            self.__values   = []
+        pass
+
+    def load_lines(self, lines, line_num=1):
+        """
+            Append GEDCOM text lines to the table, checking them just as Gedcom() does.
+
+            Return the number of the line after the last one.
+
+        """
+        for line in lines:
+            line_parts = parse_line_parts(line_num, line)
+            if  line_parts is not None:
+                check_line_level(line_num, line_parts[0], self.last_level())
+                self.append(*line_parts)
+            line_num += 1
+        self.finish()
+        return line_num
+
+    def append_table(self, other, value_offset=None):
+        """
+            Append the rows of another table, which must start at level 0, to ours.
+
+            If value_offset is None, the other table's buffer is added to the end of ours.
+            Otherwise, both tables slice their values from the same buffer and the other
+            table's values are value_offset further along in it than its offsets say.
+
+        """
+        if  not len(other):
+            return
+        if  other.levels[0] != 0:
+            raise ValueError("appended tables must start at level 0")
+        row_offset  = len(self.levels)
+        if  value_offset is None:
+            other.finish()
+            value_offset        = self.__value_end
+            self.__values.append(other.buffer)
+            self.__value_end   += len(other.buffer)
+        if  self.__open_rows:
+            self.next_siblings[self.__open_rows[0]] = row_offset
+        tag_ids     = [ self.__tag_id(tag) for tag in other.tags ]
+        crlf_ids    = [ self.__crlf_id(crlf) for crlf in other.crlfs ]
+        self.levels.extend(other.levels)
+        self.tag_ids.fromlist([ tag_ids[tag_id] for tag_id in other.tag_ids ])
+        self.crlf_ids.fromlist([ crlf_ids[crlf_id] for crlf_id in other.crlf_ids ])
+        for rows, other_rows in ( ( self.parents, other.parents, ), ( self.first_children, other.first_children, ), ( self.next_siblings, other.next_siblings, ), ):
+            rows.fromlist([ row + row_offset if row >= 0 else row for row in other_rows ])
+        self.value_starts.fromlist([ offset + value_offset for offset in other.value_starts ])
+        self.value_ends.fromlist([ offset + value_offset for offset in other.value_ends ])
+        for pointer, row in other.pointers.items():
+            self.pointers[pointer]  = row + row_offset
+        for row, pointer in other.row_pointers.items():
+            self.row_pointers[row + row_offset] = pointer
+        self.__open_rows    = [ row + row_offset for row in other.__open_rows ]
+
+    def load_bytes(self, buffer, encoding=None, errors=None, start=0, end=None, line_num=1):
+        """
+            Append the GEDCOM lines in buffer[start:end] (bytes or an mmap) to an empty table, splitting them as bytes.
+
+            The buffer becomes the table's buffer. Values are decoded with encoding and errors when they're asked for.
+            Lines are split at \\r, \\n and \\r\\n like a file opened in universal newline mode is, and
+            exactly the lines ged_line_re accepts are accepted, with the same SyntaxError()s as Gedcom() raises.
+
+            Return the number of the line after the last one.
+
+        """
+        if  len(self.levels):
+            raise ValueError("load_bytes() needs an empty table")
+        encoding    = encoding or locale.getpreferredencoding(False)
+        check_ascii_compatible(encoding)
+        self.buffer     = buffer
+        self.encoding   = encoding
+        self.errors     = errors
+        end             = len(buffer) if end is None else end
+
+        find            = buffer.find
+        level_cache     = dict((str(level).encode('ascii') + b' ', level) for level in range(10))  # level and the space after it -> level
+        tag_cache       = {}                        # tag bytes -> tag id
+        open_rows       = self.__open_rows
+        pointers        = self.pointers
+        row_pointers    = self.row_pointers
+        row             = 0
+        capacity        = 0                         # the arrays grow a block of rows at a time and are trimmed when we're done
+        no_rows         = [ -1 ] * 0x10000
+        levels          = array.array('i')
+        tag_ids         = array.array('i')
+        parents         = array.array('i')
+        first_children  = array.array('i')
+        next_siblings   = array.array('i')
+        value_starts    = array.array(_OFFSET_TYPECODE)
+        value_ends      = array.array(_OFFSET_TYPECODE)
+        all_rows        = ( levels, tag_ids, parents, first_children, next_siblings, value_starts, value_ends, )
+        has_cr          = find(b'\r', start, end) >= 0
+        next_nl         = start - 1                 # the first \n at or after pos (end if there isn't one), found again only once pos is past it
+        next_cr         = start - 1                 # ditto for \r, so files with only one kind of line end aren't searched to the end for each line
+        pos             = start
+        while pos < end:
+            if  next_nl < pos:
+                next_nl = find(b'\n', pos, end)
+                if  next_nl < 0:
+                    next_nl = end
+                pass
+            nl          = next_nl
+            nxt         = nl + 1 if nl < end else end
+            eol         = nl
+            if  has_cr:
+                if  next_cr < pos:
+                    next_cr = find(b'\r', pos, end)
+                    if  next_cr < 0:
+                        next_cr = end
+                    pass
+                cr      = next_cr
+                if  cr < nl:
+                    eol = cr
+                    nxt = nl + 1 if cr + 1 == nl else cr + 1
+
+            i           = pos + 2
+            level       = level_cache.get(buffer[pos:i])
+            if  level is None:
+                sp      = find(b' ', pos, eol)
+                if  sp > pos:
+                    level   = self.__bytes_level(buffer[pos:sp])
+                    i       = sp + 1
+                pass
+            pointer     = None
+            if  level is not None and buffer[i:i + 1] == b'@':
+                j       = find(b'@', i + 1, eol)
+                if  (j > i + 1) and (buffer[j + 1:j + 2] == b' ') and (j + 1 < eol):
+                    pointer = buffer[i:j + 1]
+                    i       = j + 2
+                else:
+                    level   = None
+                pass
+            tag_id      = None
+            if  level is not None:
+                sp      = find(b' ', i, eol)
+                if  sp < 0:
+                    sp  = eol
+                tag     = buffer[i:sp]
+                tag_id  = tag_cache.get(tag)
+                if  tag_id is None:
+                    tag_id  = self.__bytes_tag_id(tag)
+                    if  tag_id is not None:
+                        tag_cache[tag]  = tag_id
+                    pass
+                pass
+            if  tag_id is None:
+                line    = buffer[pos:eol].decode(encoding, errors or 'strict')
+                if  parse_line_parts(line_num, line + "\n") is not None:
+                    raise SyntaxError("Line %d of document could not be split as bytes" % line_num)  # can't happen: we accept what ged_line_re accepts
+                pos         = nxt                   # allow blank lines
+                line_num   += 1
+                continue
+
+            if  row == capacity:
+                for rows in all_rows:
+                    rows.fromlist(no_rows)
+                capacity   += len(no_rows)
+            depth       = len(open_rows)
+            if  level >= depth:
+                if  level > depth:
+                    check_line_level(line_num, level, depth - 1)
+                if  level:
+                    first_children[row - 1] = row   # the first child always comes right after its parent
+                    parents[row]            = row - 1
+                open_rows.append(row)
+            else:
+                next_siblings[open_rows[level]] = row
+                if  level:
+                    parents[row]            = open_rows[level - 1]
+                del open_rows[level + 1:]
+                open_rows[level]            = row
+            levels[row]         = level
+            tag_ids[row]        = tag_id
+            value_starts[row]   = sp + 1 if sp < eol else eol
+            value_ends[row]     = eol
+            if  pointer is not None:
+                pointer             = intern(pointer.decode(encoding, errors or 'strict'))
+                pointers[pointer]   = row
+                row_pointers[row]   = pointer
+            row        += 1
+            pos         = nxt
+            line_num   += 1
+        for rows in all_rows:
+            del rows[row:]
+        self.levels, self.tag_ids, self.parents = levels, tag_ids, parents
+        self.first_children, self.next_siblings = first_children, next_siblings
+        self.value_starts, self.value_ends      = value_starts, value_ends
+        self.crlf_ids   = array.array('B', [ self.__crlf_id("\n") ]) * row    # universal newlines translate all of them to \n
+        return line_num
+
+    def __tag_id(self, tag):
+        tag_id      = self.__tag_ids.get(tag)
+        if  tag_id is None:
+            tag_id  = self.__tag_ids[tag] = len(self.tags)
+            self.tags.append(intern(tag))
+        return tag_id
+
+    def __crlf_id(self, crlf):
+        crlf_id     = self.__crlf_ids.get(crlf)
+        if  crlf_id is None:
+            crlf_id = self.__crlf_ids[crlf] = len(self.crlfs)
+            self.crlfs.append(crlf)
+        return crlf_id
+
+    def __bytes_level(self, level):
+        """ Return the level as an int if the bytes are a level ged_line_re would accept. Otherwise, None. """
+        if  level.isdigit() and ((level == b'0') or (level[:1] != b'0')):
+            return int(level)
+        return None
+
+    def __bytes_tag_id(self, tag):
+        """ Return the tag's id if the bytes are a tag ged_line_re would accept. Otherwise, None. """
+        if  tag and not tag.translate(None, _TAG_BYTES):
+            return self.__tag_id(tag.decode('ascii'))
+        return None
+
+    # row accessors
+
+    def level(self, row):
+        return self.levels[row]
+
+    def pointer(self, row):
+        return self.row_pointers.get(row, '')
+
+    def tag(self, row):
+        return self.tags[self.tag_ids[row]]
+
+    def value(self, row):
+        value   = self.buffer[self.value_starts[row]:self.value_ends[row]]
+        if  self.encoding is not None:
+            value   = value.decode(self.encoding, self.errors or 'strict')
+        return value
+
+    def crlf(self, row):
+        return self.crlfs[self.crlf_ids[row]]
+
+    def child_rows(self, row):
+        """ Return the rows of the children of the row, in order. """
+        rows            = []
+        child           = self.first_children[row]
+        next_siblings   = self.next_siblings
+        while child >= 0:
+            rows.append(child)
+            child       = next_siblings[child]
+        return rows
+
+    def line(self, row):
+        """ Format the row as its original line, the way str(Element) does. """
+        result  = str(self.levels[row])
+        pointer = self.row_pointers.get(row)
+        if  pointer:
+            result += ' '  + pointer
+        result     += ' '  + self.tags[self.tag_ids[row]]
+        value       = self.value(row)
+        if  value != "":
+            result += ' '  + value
+        return result + self.crlfs[self.crlf_ids[row]]
+
+    def iter_lines(self):
+        """ Yield the formatted lines of all the rows. """
+        for row in range(len(self.levels)):
+            yield self.line(row)
+        pass
+
+    def snapshot(self):
+        """ Return the table as a dict of plain values that marshal can save. A memory-mapped buffer isn't included. """
+        self.finish()
+        snapshot    = {
+                        'version':      SNAPSHOT_VERSION,
+                        'byteorder':    sys.byteorder,
+                        'tags':         list(self.tags),
+                        'crlfs':        list(self.crlfs),
+                        'pointers':     dict(self.pointers),
+                        'row_pointers': dict(self.row_pointers),
+                        'buffer':       None if self.encoding is not None else self.buffer,
+                        'encoding':     self.encoding,
+                        'errors':       self.errors,
+                      }
+        for name in _TABLE_ARRAYS:
+            rows                = getattr(self, name)
+            snapshot[name]      = ( rows.typecode, rows.itemsize, rows.tobytes(), )
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot, buffer=None):
+        """ Return a table made from a snapshot(). buffer is the memory-mapped file, if the snapshot's table had one. """
+        table   = cls()
+        for name in _TABLE_ARRAYS:
+            typecode, itemsize, data    = snapshot[name]
+            rows                        = array.array(typecode)
+            rows.frombytes(data)
+            setattr(table, name, rows)
+        table.tags          = snapshot['tags']
+        table.crlfs         = snapshot['crlfs']
+        table.pointers      = snapshot['pointers']
+        table.row_pointers  = snapshot['row_pointers']
+        table.encoding      = snapshot['encoding']
+        table.errors        = snapshot['errors']
+        table.buffer        = buffer if table.encoding is not None else snapshot['buffer']
+        table.__tag_ids     = dict((tag, tag_id) for tag_id, tag in enumerate(table.tags))
+        table.__crlf_ids    = dict((crlf, crlf_id) for crlf_id, crlf in enumerate(table.crlfs))
+        table.__value_end   = len(table.buffer)
+        row                 = len(table.levels) - 1
+        while row >= 0:
+            table.__open_rows.insert(0, row)
+            row             = table.parents[row]
+        return table
+
+    def iter_dates(self):
+        """
+            Yield (row, record row, parse routine) for each DATE row under a level 0 row, in file order.
+
+            The parse routine is a_date.parse or a_date.parse_death_date, whichever Element.print_dates() would use for the row.
+
+        """
+        date_id     = self.tag_id("DATE")
+        death_ids   = ( self.tag_id("DEAT"), self.tag_id("BURI"), )
+        levels      = self.levels
+        tag_ids     = self.tag_ids
+        record      = -1
+        parse_rtns  = [ None, None, ]               # the parse routine in effect for the children at each level (see Element._print_dates())
+        for row in range(len(levels)):
+            level   = levels[row]
+            tag_id  = tag_ids[row]
+            if  level == 0:
+                record          = row
+                parse_rtns[1]   = None
+                continue
+            parse_rtn   = parse_rtns[level]
+            if  tag_id == date_id:
+                parse_rtn   = parse_rtns[level] = parse_rtn or a_date.parse
+                yield row, record, parse_rtn
+            if  len(parse_rtns) <= level + 1:
+                parse_rtns.append(None)
+            parse_rtns[level + 1]   = parse_rtn or ((tag_id in death_ids) and a_date.parse_death_date) or None
+        pass
+
+    def print_dates(self):
+        """ Print the dates of the table's level 0 rows just as Element.print_dates() would, but straight from the arrays. """
+        ident_record    = None
+        for row, record, parse_rtn in self.iter_dates():
+            if  record != ident_record:
+                ident_record    = record
+                ident           = self.__ident(record)
+            level   = self.levels[row]
+            value   = self.value(row)
+            print("%s %-*s %-32s %s" % ( " " * level, 18 - level, ident[:12], value, str(parse_rtn(value)), ))
+        pass
+
+    def __ident(self, row):
+        """ Return the identifier Element._print_dates() would use for a level 0 row. """
+        if  self.tag(row) == "INDI":
+            child_rows  = self.child_rows(row)
+            for tag in [ "_FSFTID", "AFN", "RIN", "_UID", "REFN", ]:
+                tag_id  = self.tag_id(tag)
+                for child in child_rows:
+                    if  self.tag_ids[child] == tag_id:
+                        value   = self.value(child)
+                        if  value:
+                            return value
+                        break
+                    pass
+                pass
+            pass
+        return self.pointer(row)
+
+    #   ElementTable
+
+
+class ElementView(Element):
+    """ An Element that's a light-weight view of one row of an ElementTable
+
+    Views are made when they're asked for and aren't kept, so two views
+    of the same row are equal but not necessarily the same object.
+    Views can't be changed.
+    """
+
+    __slots__ = ('_table', '_row', )
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def row(self):
+        """ Return the table row this element is a view of """
+        return self._row
+
+    def level(self):
+        return self._table.levels[self._row]
+
+    def pointer(self):
+        return self._table.row_pointers.get(self._row, '')
+
+    def tag(self):
+        return self._table.tags[self._table.tag_ids[self._row]]
+
+    def value(self):
+        return self._table.value(self._row)
+
+    def children(self):
+        table   = self._table
+        return [ ElementView(table, row) for row in table.child_rows(self._row) ]
+
+    def children_with_tag(self, tag):
+        table   = self._table
+        tag_id  = table.tag_id(tag)
+        if  tag_id < 0:
+            return []
+        tag_ids = table.tag_ids
+        return [ ElementView(table, row) for row in table.child_rows(self._row) if tag_ids[row] == tag_id ]
+
+    _children   = children
+
+    def full_value(self):
+        return join_continuations(self.value(), (), self.children())
+
+    def folded(self):
+        return ()
+
+    def parent(self):
+        """ Return the parent element of this element, or None for level 0 elements """
+        row     = self._table.parents[self._row]
+        if  row < 0:
+            return None
+        return ElementView(self._table, row)
+
+    def add_child(self, element):
+        raise TypeError("ElementView elements can't be changed")
+
+    def add_parent(self, element):
+        raise TypeError("ElementView elements can't be changed")
+
+    def __eq__(self, other):
+        return isinstance(other, ElementView) and (self._row == other._row) and (self._table is other._table)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._row)
+
+    def __str__(self):
+        return self._table.line(self._row)
+
+    #   ElementView
+
+
+class ElementTableList(object):
+    """ A read-only sequence of ElementView()s of all the rows of an ElementTable, in file order """
+
+    def __init__(self, table):
+        self.__table = table
+
+    def __len__(self):
+        return len(self.__table)
+
+    def __getitem__(self, index):
+        if  isinstance(index, slice):
+            return [ ElementView(self.__table, row) for row in range(*index.indices(len(self.__table))) ]
+        if  index < 0:
+            index  += len(self.__table)
+        if  not (0 <= index < len(self.__table)):
+            raise IndexError("element index out of range")
+        return ElementView(self.__table, index)
+
+    def __iter__(self):
+        table   = self.__table
+        for row in range(len(table)):
+            yield ElementView(table, row)
+        pass
+
+    #   ElementTableList
+
+
+_record_head_re     = re.compile(b'0 (@[^@\r\n]+@ )?')
+_record_start_re    = re.compile(b'[\r\n]0 (@[^@\r\n]+@ )?')
+
+
+class RecordIndex(object):
+    """ Where each level 0 record of a memory-mapped GEDCOM file is, for Gedcom(storage="lazy")
+
+    starts holds the byte offset of each record, in file order. A record
+    runs up to the start of the next one. pointers maps each record's
+    pointer to its record number. Records are parsed in to Element trees
+    (with no parent) the first time record() is asked for them and kept.
+    """
+
+    def __init__(self, filepath, encoding=None, errors=None, opener=None):
+        self.buffer, self.start, self.encode = map_gedcom_file(filepath, opener=opener)
+        self.encoding   = encoding
+        self.errors     = errors
+        check_ascii_compatible(encoding or locale.getpreferredencoding(False))
+        buffer          = self.buffer
+        self.starts     = array.array(_OFFSET_TYPECODE)
+        self.pointers   = {}
+        g               = _record_head_re.match(buffer, self.start)
+        if  g:
+            self.__add_record(self.start, g.group(1))
+        for g in _record_start_re.finditer(buffer, self.start):
+            self.__add_record(g.start() + 1, g.group(1))
+        self.__records  = [ None ] * len(self.starts)
+        first           = self.starts[0] if len(self.starts) else len(buffer)
+        if  first > self.start:
+            self.__parse_range(self.start, first, 1)    # nothing but blank lines should come before the first record
+        pass
+
+    def __add_record(self, start, pointer):
+        if  pointer:
+            self.pointers[intern(pointer[:-1].decode(self.encoding or locale.getpreferredencoding(False), self.errors or 'strict'))] = len(self.starts)
+        self.starts.append(start)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def record(self, number):
+        """ Return the Element of the given record number, parsing it if it hasn't been yet. """
+        record  = self.__records[number]
+        if  record is None:
+            start   = self.starts[number]
+            end     = self.starts[number + 1] if number + 1 < len(self.starts) else len(self.buffer)
+            try:
+                record  = self.__parse_range(start, end, 1)
+            except SyntaxError:
+                self.__parse_range(start, end, self.__line_num(start))  # raise it again with the right line number
+                raise
+            self.__records[number]  = record
+        return record
+
+    def parsed(self):
+        """ Return the numbers of the records that have been parsed so far. """
+        return [ number for number, record in enumerate(self.__records) if record is not None ]
+
+    def element_list(self):
+        """ Return all the elements of all the records, in file order. """
+        elements    = []
+        for number in range(len(self.starts)):
+            stack   = [ self.record(number) ]
+            while stack:
+                element = stack.pop()
+                elements.append(element)
+                stack.extend(reversed(element._children()))
+            pass
+        return elements
+
+    def __parse_range(self, start, end, line_num):
+        lines   = io.TextIOWrapper(io.BytesIO(self.buffer[start:end]), encoding=self.encoding, errors=self.errors, newline=None)
+        for record in _iter_records(lines, line_num):
+            return record
+        return None
+
+    def __line_num(self, pos):
+        """ Return the line number of the line starting at pos. """
+        data    = self.buffer[self.start:pos]
+        return data.count(b'\n') + data.count(b'\r') - data.count(b'\r\n') + 1
+
+    #   RecordIndex
+
+
+class LazyElementDict(Mapping):
+    """ The element_dict() of a Gedcom(storage="lazy") - level 0 records by pointer, parsed when they're first looked up """
+
+    def __init__(self, records):
+        self.__records = records
+
+    def __getitem__(self, pointer):
+        return self.__records.record(self.__records.pointers[pointer])
+
+    def __contains__(self, pointer):
+        return pointer in self.__records.pointers
+
+    def __iter__(self):
+        return iter(self.__records.pointers)
+
+    def __len__(self):
+        return len(self.__records.pointers)
+
+    #   LazyElementDict
+
+
+class Adjacency(object):
+    """ Lists of node ids, one list per node, packed in to two arrays (compressed sparse rows) """
+
+    def __init__(self, lists=()):
+        """ Pack the given lists of node ids, the list of node 0 first. """
+        starts          = [ 0 ]
+        end             = 0
+        for targets in lists:
+            end        += len(targets)
+            starts.append(end)
+        self.starts     = array.array('i', starts)      # the list of node n is targets[starts[n]:starts[n + 1]]
+        self.targets    = array.array('i', [ target for targets in lists for target in targets ])
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, node):
+        return self.targets[self.starts[node]:self.starts[node + 1]]
+
+    def degree(self, node):
+        return self.starts[node + 1] - self.starts[node]
+
+    def inverse(self):
+        """ Return the Adjacency with every node's list holding the nodes whose lists have it, in node order. """
+        lists   = [ [] for node in range(len(self)) ]
+        for node in range(len(self)):
+            for target in self[node]:
+                lists[target].append(node)
+            pass
+        return Adjacency(lists)
+
+    #   Adjacency
+
+
+class RelationshipGraph(object):
+    """ The family links of a Gedcom, as Adjacency lists over integer node ids
+
+    Every element with a pointer is a node. Its id is its place in pointers,
+    and ids maps pointers back to ids. kinds holds INDIVIDUAL, FAMILY or
+    OTHER for each node.
+
+    For individuals:
+        famc, fams          - the FAM nodes of their FAMC and FAMS lines, in order
+        parents             - the HUSB and WIFE members of their famc families
+        parent_natural      - 1 or 0 for each parents entry: whether a _MREL/_FREL/MREL/FREL of "Natural" says that parent is a natural parent
+        natural_parents     - what get_parents(indi, "NAT") returns
+        children            - the CHIL members of their fams families
+        spouses             - the other HUSB and WIFE members of their fams families
+    For families:
+        members             - the HUSB, WIFE and CHIL members, in order
+        member_roles        - HUSB, WIFE or CHIL for each members entry
+
+    Lists keep the order and duplicates that the Gedcom methods have always
+    returned, and hold only the nodes of pointers that are in the file.
+    Nodes that aren't individuals (or families) have empty lists.
+    """
+
+    OTHER, INDIVIDUAL, FAMILY   = 0, 1, 2
+    HUSB, WIFE, CHIL            = 0, 1, 2
+
+    def __init__(self, gedcom):
+        get_element     = gedcom.get_element
+        self.pointers   = pointers = list(gedcom.element_dict())
+        self.ids        = ids = dict((pointer, node) for node, pointer in enumerate(pointers))
+        kinds           = [ self.OTHER ] * len(pointers)
+        none            = ()
+        famc            = [ none ] * len(pointers)  # FAMC, FAMS, members and member roles lists, by node
+        fams            = [ none ] * len(pointers)
+        members         = [ none ] * len(pointers)
+        member_roles    = [ none ] * len(pointers)
+        naturals        = {}                        # family node -> { CHIL value : [ natural parent roles ] }
+        roles           = { "HUSB": self.HUSB, "WIFE": self.WIFE, "CHIL": self.CHIL, }
+        natural_roles   = { "_MREL": self.WIFE, "MREL": self.WIFE, "_FREL": self.HUSB, "FREL": self.HUSB, }
+        for node, pointer in enumerate(pointers):
+            element     = get_element(pointer)
+            tag         = element.tag()
+            if  tag == "INDI":
+                kinds[node] = self.INDIVIDUAL
+                famc[node]  = [ e.value() for e in element.children() if e.tag() == "FAMC" ]
+                fams[node]  = [ e.value() for e in element.children() if e.tag() == "FAMS" ]
+            elif tag == "FAM":
+                kinds[node] = self.FAMILY
+                values      = []
+                for e in element.children():
+                    role    = roles.get(e.tag())
+                    if  role is not None:
+                        values.append(( role, e.value(), ))
+                        if  role == self.CHIL:
+                            for c in e._children():
+                                if  (c.value() == "Natural") and (c.tag() in natural_roles):
+                                    naturals.setdefault(node, {}).setdefault(e.value(), []).append(natural_roles[c.tag()])
+                                pass
+                            pass
+                        pass
+                    pass
+                members[node]       = [ ids[v] for role, v in values if v in ids ]
+                member_roles[node]  = [ role for role, v in values if v in ids ]
+            pass
+        self.kinds      = array.array('B', kinds)
+
+        family          = self.FAMILY
+        for node, kind in enumerate(kinds):
+            if  kind == self.INDIVIDUAL:
+                famc[node]  = [ ids[v] for v in famc[node] if (v in ids) and (kinds[ids[v]] == family) ]
+                fams[node]  = [ ids[v] for v in fams[node] if (v in ids) and (kinds[ids[v]] == family) ]
+            pass
+
+        by_role         = {}                        # family node -> ( [ HUSB nodes ], [ WIFE nodes ], [ CHIL nodes ], [ HUSB and WIFE nodes ] )
+        for node, kind in enumerate(kinds):
+            if  kind == family:
+                family_roles    = ( [], [], [], [], )
+                for role, member in zip(member_roles[node], members[node]):
+                    family_roles[role].append(member)
+                    if  role != self.CHIL:
+                        family_roles[3].append(member)
+                    pass
+                by_role[node]   = family_roles
+            pass
+
+        parents         = [ none ] * len(pointers)
+        parent_natural  = [ none ] * len(pointers)
+        natural_parents = [ none ] * len(pointers)
+        children        = [ none ] * len(pointers)
+        spouses         = [ none ] * len(pointers)
+        for node, kind in enumerate(kinds):
+            if  kind != self.INDIVIDUAL:
+                continue
+            pointer     = pointers[node]
+            if  famc[node]:
+                parents[node]       = [ parent for fam in famc[node] for parent in by_role[fam][3] ]
+                naturals_of_node    = [ parent for fam in famc[node] for role in naturals.get(fam, {}).get(pointer, none) for parent in by_role[fam][role] ]
+                if  naturals_of_node:
+                    natural_parents[node]   = naturals_of_node
+                    parent_natural[node]    = [ int(parent in naturals_of_node) for parent in parents[node] ]
+                else:
+                    parent_natural[node]    = [ 0 ] * len(parents[node])
+                pass
+            if  fams[node]:
+                children[node]      = [ child for fam in fams[node] for child in by_role[fam][self.CHIL] ]
+                spouses[node]       = [ spouse for fam in fams[node] for spouse in by_role[fam][3] if spouse != node ]
+            pass
+
+        self.famc               = Adjacency(famc)
+        self.fams               = Adjacency(fams)
+        self.members            = Adjacency(members)
+        self.member_roles       = array.array('B', [ role for node_roles in member_roles for role in node_roles ])
+        self.parents            = Adjacency(parents)
+        self.parent_natural     = array.array('B', [ natural for node_naturals in parent_natural for natural in node_naturals ])
+        self.natural_parents    = Adjacency(natural_parents)
+        self.children           = Adjacency(children)
+        self.spouses            = Adjacency(spouses)
+        pass
+
+    def __len__(self):
+        return len(self.pointers)
+
+    def family_members(self, family, roles=( HUSB, WIFE, CHIL, )):
+        """ Return the member nodes of the family node with the given roles, in order. """
+        start   = self.members.starts[family]
+        end     = self.members.starts[family + 1]
+        member_roles    = self.member_roles
+        return [ member for member, i in zip(self.members.targets[start:end], range(start, end)) if member_roles[i] in roles ]
+
+    def individuals(self):
+        """ Return the individual nodes, in order. """
+        return [ node for node, kind in enumerate(self.kinds) if kind == self.INDIVIDUAL ]
+
+    #   RelationshipGraph
+
+
+class Closures(object):
+    """ Ancestor and descendant closures over a RelationshipGraph, worked out without recursion
+
+    With natural=True, only natural parents (those get_parents(indi, "NAT")
+    returns) and the children they're natural parents of are followed.
+    Otherwise parents are the graph's parents and children are its children.
+
+    Closures are lists of node ids, each node once, or bitsets: Python ints
+    with bit n set for node n in the closure. With memoize=True, the bitset
+    of every node worked out along the way is kept, so the bitsets of all
+    the people in a file take about as long to get as the file is big.
+    Loops in the tree (someone their own ancestor) are allowed. Everyone
+    in a loop shares one bitset, so loops don't slow that down.
+    """
+
+    def __init__(self, graph, natural=False, memoize=True):
+        self.graph      = graph
+        self.natural    = natural
+        self.parents    = graph.natural_parents if natural else graph.parents
+        self.children   = graph.natural_parents.inverse() if natural else graph.children
+        self.memoize    = memoize
+        self.__bits     = ( {}, {}, )               # ancestor, descendant bitsets by node
+
+    def ancestors(self, node):
+        """ Return the ancestor nodes, parents first, then their ancestors, in the order get_ancestors() has always found them. """
+        return self.__closure(node, self.parents)
+
+    def descendants(self, node):
+        """ Return the descendant nodes, children first, then their descendants. """
+        return self.__closure(node, self.children)
+
+    def __closure(self, node, adjacency):
+        found   = []
+        seen    = set()
+        done    = set()                             # nodes whose parents (or children) have been looked at. Looking again would find no one new.
+        stack   = [ node ]
+        while stack:
+            node    = stack.pop()
+            if  node in done:
+                continue
+            done.add(node)
+            nodes   = adjacency[node]
+            for n in nodes:
+                if  n not in seen:
+                    seen.add(n)
+                    found.append(n)
+                pass
+            stack.extend(n for n in reversed(nodes) if n not in done)
+        return found
+
+    def generations(self, node, max_generations=None, descendants=False):
+        """
+            Return ( node, generation ) for each ancestor (or descendant) of the node, nearest first.
+
+            Parents (or children) are generation 1. Someone who can be reached more than
+            one way is listed once, with the fewest generations. With max_generations, no
+            one further away than that is listed.
+
+        """
+        adjacency   = self.children if descendants else self.parents
+        found       = []
+        seen        = set([ node ])
+        level       = [ node ]
+        generation  = 0
+        while level and ((max_generations is None) or (generation < max_generations)):
+            generation += 1
+            next_level  = []
+            for n in level:
+                for m in adjacency[n]:
+                    if  m not in seen:
+                        seen.add(m)
+                        next_level.append(m)
+                        found.append(( m, generation, ))
+                    pass
+                pass
+            level   = next_level
+        return found
+
+    def ancestor_bits(self, node):
+        """ Return the bitset of the node's ancestors. """
+        return self.__closure_bits(node, self.parents, self.__bits[0])
+
+    def descendant_bits(self, node):
+        """ Return the bitset of the node's descendants. """
+        return self.__closure_bits(node, self.children, self.__bits[1])
+
+    def is_ancestor(self, ancestor, node):
+        """ Return whether ancestor is an ancestor of node. """
+        return bool((self.ancestor_bits(node) >> ancestor) & 1)
+
+    def __closure_bits(self, node, adjacency, memo):
+        if  node in memo:
+            return memo[node]
+        if  not self.memoize:
+            return self.__search_bits(node, adjacency)
+        # Tarjan's strongly connected components, without recursion. The people in a loop all have
+        # the same ancestors (or descendants), so each component gets one bitset, worked out from
+        # the bitsets of the components it leads to. Tarjan finds those first.
+        index   = {}                                # node -> order it was found in
+        low     = {}                                # node -> lowest index it can get back to
+        found   = []                                # nodes found whose component isn't finished
+        on_found    = set()
+        stack   = [ ( node, adjacency[node], 0, ) ]
+        index[node] = low[node] = 0
+        found.append(node)
+        on_found.add(node)
+        while stack:
+            n, nodes, i = stack.pop()
+            while i < len(nodes):
+                m   = nodes[i]
+                i  += 1
+                if  m in memo:
+                    continue
+                if  m not in index:
+                    stack.append(( n, nodes, i, ))
+                    index[m] = low[m]   = len(index)
+                    found.append(m)
+                    on_found.add(m)
+                    stack.append(( m, adjacency[m], 0, ))
+                    break
+                if  m in on_found and index[m] < low[n]:
+                    low[n]  = index[m]
+                pass
+            else:
+                if  low[n] == index[n]:
+                    component   = found[found.index(n):]
+                    del found[len(found) - len(component):]
+                    on_found.difference_update(component)
+                    bits    = 0
+                    for c in component:
+                        for m in adjacency[c]:
+                            bits   |= memo.get(m, 0) | (1 << m)    # not in memo yet if it's in this component
+                        pass
+                    for c in component:
+                        memo[c] = bits
+                    pass
+                if  stack and low[n] < low[stack[-1][0]]:
+                    low[stack[-1][0]]   = low[n]
+                pass
+            pass
+        return memo[node]
+
+    def __search_bits(self, node, adjacency):
+        bits    = 0
+        stack   = [ node ]
+        while stack:
+            for m in adjacency[stack.pop()]:
+                if  not ((bits >> m) & 1):
+                    bits   |= 1 << m
+                    stack.append(m)
+                pass
+            pass
+        return bits
+
+    @staticmethod
+    def bit_nodes(bits):
+        """ Return the nodes of a bitset, in node order. """
+        return [ node for node, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1' ]
+
+    #   Closures
+
+
+def compile_criteria(criteria):
+    """
+        Return the tests of an Element.criteria_match() criteria string, or None if nothing can match it.
+
+        Each test is ( column, text, ) for a surname or name that must be
+        in the PersonTable column, or ( column, year1, year2, ) for a
+        birth or death year that must be from year1 to year2.
+        Unknown keys are skipped, as criteria_match() skips them.
+
+    """
+    try:
+        items   = [ crit.split('=') for crit in criteria.split(':') ]
+        items   = [ ( key, value, ) for key, value in items ]
+    except Exception:
+        return None                             # criteria_match() is False for everyone
+    tests   = []
+    for key, value in items:
+        if  key == "surname":
+            tests.append(( "surnames", value, ))
+        elif key == "name":
+            tests.append(( "given_names", value, ))
+        elif key in ( "birth", "death", "birthrange", "deathrange", ):
+            try:
+                if  key.endswith("range"):
+                    year1, year2    = value.split('-')
+                    year1, year2    = int(year1), int(year2)
+                else:
+                    year1 = year2   = int(value)
+            except Exception:
+                return None
+            tests.append(( key[:5] + "_years", year1, year2, ))
+        pass
+    return tests
+
+
+class PersonTable(object):
+    """ Columns of the things Element.criteria_match() looks at, for a list of individuals
+
+    elements        - the individuals
+    given_names     - name()[0] of each of them
+    surnames        - name()[1]
+    sexes           - gender()
+    birth_years     - birth_year(), -1 if there isn't one, in an array('i')
+    death_years     - death_year(), -1 if there isn't one, in an array('i')
+    pointer_rows    - pointer -> row
+
+    The year columns are compared with numpy if it's installed. The name
+    columns get a NameIndex the first time name_index() is asked for one,
+    and a SimilarNameIndex the first time similar_name_index() is called.
+    add() and update() keep the indexes up to date. Nothing calls them when
+    an element is changed; Gedcom.update_person() does, when it's told.
+    """
+
+    NAME_COLUMNS    = ( "given_names", "surnames", )
+
+    def __init__(self, elements=()):
+        self.elements       = list(elements)
+        names               = [ e.name() for e in self.elements ]
+        self.given_names    = [ name[0] for name in names ]
+        self.surnames       = [ name[1] for name in names ]
+        self.sexes          = [ e.gender() for e in self.elements ]
+        self.birth_years    = array.array('i', [ e.birth_year() for e in self.elements ])
+        self.death_years    = array.array('i', [ e.death_year() for e in self.elements ])
+        self.pointer_rows   = dict((e.pointer(), row) for row, e in enumerate(self.elements))
+        self.__indexes      = {}
+        self.__similar      = None
+        pass
+
+    def __len__(self):
+        return len(self.elements)
+
+    def add(self, element):
+        """ Add an individual to the end of the table. Return its row. """
+        row     = len(self.elements)
+        first, last = element.name()
+        self.elements.append(element)
+        self.pointer_rows[element.pointer()]    = row
+        self.given_names.append(first)
+        self.surnames.append(last)
+        self.sexes.append(element.gender())
+        self.birth_years.append(element.birth_year())
+        self.death_years.append(element.death_year())
+        for column, index in self.__indexes.items():
+            index.add(row, getattr(self, column)[row])
+        if  self.__similar is not None:
+            self.__similar.add(row, first, last)
+        return row
+
+    def update(self, row):
+        """ Look at the individual in the row again, after it's been changed. """
+        element = self.elements[row]
+        self.given_names[row], self.surnames[row]   = element.name()
+        self.sexes[row]         = element.gender()
+        self.birth_years[row]   = element.birth_year()
+        self.death_years[row]   = element.death_year()
+        for column, index in self.__indexes.items():
+            index.update(row, getattr(self, column)[row])
+        if  self.__similar is not None:
+            self.__similar.update(row, self.given_names[row], self.surnames[row])
+        pass
+
+    def name_index(self, column):
+        """ Return the NameIndex of the given_names or surnames column, making it the first time it's asked for. """
+        if  column not in self.NAME_COLUMNS:
+            raise ValueError("column must be one of: " + ", ".join(self.NAME_COLUMNS))
+        index   = self.__indexes.get(column)
+        if  index is None:
+            index   = self.__indexes[column] = NameIndex(getattr(self, column))
+        return index
+
+    def similar_name_index(self):
+        """ Return the SimilarNameIndex of the given names and surnames, making it the first time it's asked for. """
+        if  self.__similar is None:
+            self.__similar  = SimilarNameIndex(self.given_names, self.surnames)
+        return self.__similar
+
+    def select(self, tests):
+        """ Return the rows that pass all of compile_criteria()'s tests, in order. Names are looked up in their NameIndexes, then the years are checked. """
+        year_tests  = [ test for test in tests if len(test) == 3 ]
+        name_tests  = [ test for test in tests if len(test) == 2 ]
+        low, high   = -(1 << 31), (1 << 31) - 1     # what the year columns can hold
+        rows        = None
+        for column, text in name_tests:
+            found   = self.name_index(column).find(text)
+            rows    = found if rows is None else sorted(set(rows).intersection(found))
+        if  (numpy is not None) and year_tests:
+            mask    = numpy.ones(len(self.elements), dtype = bool)
+            for column, year1, year2 in year_tests:
+                if  (year1 > high) or (year2 < low) or (year1 > year2):
+                    return []
+                years   = numpy.frombuffer(getattr(self, column), dtype = numpy.intc)
+                mask   &= (years >= max(year1, low)) & (years <= min(year2, high))
+            if  rows is None:
+                return numpy.flatnonzero(mask).tolist()
+            return [ i for i, ok in zip(rows, mask[rows].tolist()) if ok ]
+        if  rows is None:
+            rows    = range(len(self.elements))
+        for column, year1, year2 in year_tests:
+            years   = getattr(self, column)
+            rows    = [ i for i in rows if year1 <= years[i] <= year2 ]
+        return list(rows)
+
+    #   PersonTable
+
+
+class NameIndex(object):
+    """ Exact, prefix and substring lookups of the rows of a column of names
+
+    Each different name gets a name id. Every three character piece
+    (trigram) of a name has a posting list of the ids of the names it's
+    in, in id order. A substring lookup intersects the posting lists of
+    the text's trigrams, smallest first, and checks the names that are
+    left. Texts shorter than three characters are checked against each
+    different name. Lookups are case sensitive, as criteria_match() is.
+    """
+
+    GRAM    = 3
+
+    def __init__(self, names=()):
+        self.names      = []                        # by name id
+        self.ids        = {}                        # name -> name id
+        self.rows       = []                        # by name id: the rows with the name
+        self.row_names  = array.array('i')          # by row: name id, or -1 for a row that's not been added
+        self.__grams    = {}                        # trigram -> array('i') of name ids
+        self.__sorted   = None                      # the names in sorted order, for prefix(), made when needed
+        for row, name in enumerate(names):
+            self.add(row, name)
+        pass
+
+    def __len__(self):
+        return len(self.row_names)
+
+    def __name_id(self, name):
+        name_id = self.ids.get(name)
+        if  name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.rows.append([])
+            grams   = self.__grams
+            n       = self.GRAM
+            for gram in set(name[i:i + n] for i in range(len(name) - n + 1)):
+                posting = grams.get(gram)
+                if  posting is None:
+                    posting = grams[gram] = array.array('i')
+                posting.append(name_id)
+            self.__sorted   = None
+        return name_id
+
+    def add(self, row, name):
+        """ Say that the row has the name. Rows are added in order. """
+        name_id = self.__name_id(name)
+        while len(self.row_names) <= row:
+            self.row_names.append(-1)
+        self.row_names[row] = name_id
+        self.rows[name_id].append(row)
+
+    def update(self, row, name):
+        """ Say that the row has the name, now. """
+        old     = self.row_names[row]
+        if  (old >= 0) and (self.names[old] == name):
+            return
+        if  old >= 0:
+            self.rows[old].remove(row)
+        name_id = self.__name_id(name)
+        self.row_names[row] = name_id
+        bisect.insort(self.rows[name_id], row)
+
+    def __rows(self, name_ids):
+        rows    = [ row for name_id in name_ids for row in self.rows[name_id] ]
+        rows.sort()
+        return rows
+
+    def exact(self, name):
+        """ Return the rows with the name, in order. """
+        name_id = self.ids.get(name)
+        return [] if name_id is None else list(self.rows[name_id])
+
+    def prefix(self, text):
+        """ Return the rows with names starting with text, in order. """
+        if  self.__sorted is None:
+            self.__sorted   = sorted(self.names)
+        names   = self.__sorted
+        i       = bisect.bisect_left(names, text)
+        name_ids    = []
+        while (i < len(names)) and names[i].startswith(text):
+            name_ids.append(self.ids[names[i]])
+            i  += 1
+        return self.__rows(name_ids)
+
+    def find(self, text):
+        """ Return the rows with text somewhere in their names, in order. """
+        n       = self.GRAM
+        if  len(text) < n:
+            return self.__rows(name_id for name_id, name in enumerate(self.names) if text in name)
+        postings    = []
+        for gram in set(text[i:i + n] for i in range(len(text) - n + 1)):
+            posting = self.__grams.get(gram)
+            if  posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key = len)
+        candidates  = set(postings[0])
+        for posting in postings[1:]:
+            if  len(posting) > 8 * len(candidates):
+                break                               # quicker to check the few names left than to intersect with a long list
+            candidates  = candidates.intersection(posting)
+        names   = self.names
+        return self.__rows(name_id for name_id in candidates if text in names[name_id])
+
+    #   NameIndex
+
+
+SOUNDEX_CODES   = dict([ ( c, d, ) for letters, d in ( ( "bfpv", "1", ), ( "cgjkqsxz", "2", ), ( "dt", "3", ), ( "l", "4", ), ( "mn", "5", ), ( "r", "6", ), ) for c in letters ])
+
+
+def split_name(name):
+    """ Return ( given names, surname, ) of a (given names, surname) tuple, a NAME value like "John /Smith/", or "John Smith". """
+    if  not isinstance(name, basestring):
+        first, last = name
+        return first, last
+    if  '/' in name:
+        name    = name.split('/')
+        return name[0].strip(), name[1].strip()
+    words   = name.split()
+    return " ".join(words[:-1]), " ".join(words[-1:])
+
+
+def normal_name(name):
+    """ Return the name in lower case ASCII letters with single spaces between the words. """
+    name    = best_ascii(name).lower()
+    return " ".join("".join(c if c.isalpha() else " " for c in name).split())
+
+
+def soundex(name):
+    """ Return the (American) Soundex code of the name: "Robert" and "Rupert" are both "R163". "" if the name has no letters. """
+    letters = [ c for c in normal_name(name) if c != " " ]
+    if  not letters:
+        return ""
+    code    = letters[0].upper()
+    last    = SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        if  c in "hw":
+            continue                                # h and w don't split letters with the same code
+        d   = SOUNDEX_CODES.get(c)
+        if  (d is not None) and (d != last):
+            code   += d
+            if  len(code) == 4:
+                break
+            pass
+        last    = d
+    return (code + "000")[:4]
+
+
+class SimilarNameIndex(object):
+    """ Find the names most like a name, scoring only a shortlist of them with str_ratio()
+
+    Names are (given names, surname) pairs, looked at as normal_name()s of
+    "given names surname". Each different name gets a name id, with
+    posting lists of the name ids of each trigram of the name (with a
+    space on each end) and of each surname soundex() code.
+
+    similar() counts the trigrams each name shares with the name asked
+    about, ranks the names by how much of their trigrams are shared (names
+    with the same surname soundex code get a boost), and str_ratio()
+    scores the best of them. Only the posting lists of the rarest of the
+    name's trigrams are read: a trigram in more than MAX_POSTING names
+    (like the "smi" of Smith in a big file) says little about which names
+    are alike, and reading its list would be nearly a scan of all names.
+    The names found that way are ranked by all the trigrams they share.
+    """
+
+    GRAM        = 3
+    SOUND_BOOST = 0.25
+    MAX_POSTING = 1000              # longer posting lists aren't read (but the MIN_GRAMS rarest trigrams' always are)
+    MIN_GRAMS   = 3
+    MIN_SHARE   = 0.5               # names with less than this part of the trigrams read (and at least one) aren't ranked
+    MAX_CANDIDATES  = 1000          # and only this many of the names with the most of them are
+
+    def __init__(self, given_names=(), surnames=()):
+        self.names      = []                        # by name id: "given names surname"
+        self.ids        = {}                        # name -> name id
+        self.rows       = []                        # by name id: the rows with the name
+        self.row_names  = array.array('i')          # by row: name id, or -1 for a row that's not been added
+        self.sounds     = []                        # by name id: soundex() of the surname
+        self.gram_counts    = array.array('i')      # by name id: how many different trigrams the name has
+        self.__grams    = {}                        # trigram -> array('i') of name ids
+        self.__sounds   = {}                        # soundex code -> array('i') of name ids
+        for row, ( first, last, ) in enumerate(zip(given_names, surnames)):
+            self.add(row, first, last)
+        pass
+
+    def __len__(self):
+        return len(self.row_names)
+
+    def grams(self, name):
+        """ Return the set of trigrams of a normal_name(), with a space on each end. """
+        name    = " " + name + " "
+        n       = self.GRAM
+        return set(name[i:i + n] for i in range(len(name) - n + 1))
+
+    def key(self, first, last):
+        """ Return ( normal_name(), surname soundex code, ) of given names and a surname. """
+        return normal_name(first + " " + last), soundex(last)
+
+    def __name_id(self, first, last):
+        name, sound = self.key(first, last)
+        name_id = self.ids.get(name)
+        if  name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.rows.append([])
+            self.sounds.append(sound)
+            grams   = self.grams(name)
+            self.gram_counts.append(len(grams))
+            for key, postings in [ ( gram, self.__grams, ) for gram in grams ] + [ ( sound, self.__sounds, ) ]:
+                posting = postings.get(key)
+                if  posting is None:
+                    posting = postings[key] = array.array('i')
+                posting.append(name_id)
+            pass
+        return name_id
+
+    def add(self, row, first, last):
+        """ Say that the row has the given names and surname. Rows are added in order. """
+        name_id = self.__name_id(first, last)
+        while len(self.row_names) <= row:
+            self.row_names.append(-1)
+        self.row_names[row] = name_id
+        self.rows[name_id].append(row)
+
+    def update(self, row, first, last):
+        """ Say that the row has the given names and surname, now. """
+        old     = self.row_names[row]
+        name_id = self.__name_id(first, last)
+        if  old != name_id:
+            if  old >= 0:
+                self.rows[old].remove(row)
+            self.row_names[row] = name_id
+            bisect.insort(self.rows[name_id], row)
+        pass
+
+    def similar(self, first, last, k=10, shortlist=None):
+        """
+            Return up to k ( score, row, ) pairs of the rows with the names most like the given names and surname, best first.
+
+            Scores are str_ratio()s of the names. Only the shortlist (by
+            default max(4 * k, 32)) names sharing the most trigrams are scored.
+
+        """
+        name, sound = self.key(first, last)
+        grams       = self.grams(name)
+        postings    = sorted(( self.__grams.get(gram, ()) for gram in grams ), key = len)
+        found       = {}                            # name id -> how many of the trigrams read it has
+        read        = 0
+        for posting in postings:
+            if  not posting:
+                continue                            # a trigram no name has, like one from a misspelling, isn't counted
+            if  (len(posting) > self.MAX_POSTING) and (read >= self.MIN_GRAMS):
+                break
+            for name_id in posting:
+                found[name_id]  = found.get(name_id, 0) + 1
+            read   += 1
+        least       = max(1, int(self.MIN_SHARE * read))
+        counted     = found
+        found       = [ name_id for name_id, s in counted.items() if s >= least ]
+        if  len(found) > self.MAX_CANDIDATES:
+            found   = heapq.nlargest(self.MAX_CANDIDATES, found, key = counted.get)
+        sound_ids   = self.__sounds.get(sound, ()) if sound else ()
+        if  len(sound_ids) <= self.MAX_POSTING:
+            found   = set(found).union(sound_ids)
+        names       = self.names
+        shared      = dict(( name_id, len(grams.intersection(self.grams(names[name_id]))), ) for name_id in found)    # all the trigrams they share, now that there are only a few names
+        n           = len(grams)
+        counts      = self.gram_counts
+        sounds      = self.sounds
+        boost       = self.SOUND_BOOST
+        def overlap(name_id):
+            s   = shared[name_id]
+            return float(s) / (n + counts[name_id] - s) + (boost if sounds[name_id] == sound else 0.0)
+        candidates  = heapq.nlargest(shortlist or max(4 * k, 32), shared, key = overlap)
+        scored      = sorted(( ( -str_ratio(name, self.names[name_id]), name_id, ) for name_id in candidates ))
+        results     = []
+        for score, name_id in scored:
+            for row in self.rows[name_id]:
+                if  len(results) == k:
+                    return results
+                results.append(( -score, row, ))
+            pass
+        return results
+
+    #   SimilarNameIndex
+
+
+class YearIndex(object):
+    """ Sorted arrays of the years of people's events, for finding who has an event in a range of years
+
+    Events are "birth" (birth_date()), "death" (death_date()) and
+    "marriage" (Gedcom.marriage_dates()). A date stands for a range of
+    years: just its year, or, with slack, year - slack to year + slack for
+    an "about" date, year - slack to year for a "before" date and year to
+    year + slack for an "after" date. With no slack, a date is just its
+    year, as birth_range_match() and the like see it.
+
+    For each event, the lows, highs and rows of the dates are kept in
+    array('i')s in order of low, so between() bisects to the dates that
+    can be in the range and looks at only them.
+    """
+
+    EVENTS  = ( "birth", "death", "marriage", )
+
+    def __init__(self, slack=0):
+        self.slack      = slack
+        self.lows       = {}                        # event -> array('i') of the low years, in order
+        self.highs      = {}                        # event -> array('i') of the high years
+        self.rows       = {}                        # event -> array('i') of the rows
+        self.widths     = {}                        # event -> the greatest high - low
+        self.__dates    = dict((event, []) for event in self.EVENTS)
+
+    def add(self, event, row, date):
+        """ Add the a_date (or None) of a row's event. Call finish() after the last one. """
+        if  (not date) or (date.year is None):
+            return
+        low = high  = date.year
+        if  date.about:
+            low, high   = low - self.slack, high + self.slack
+        elif date.before:
+            low        -= self.slack
+        elif date.after:
+            high       += self.slack
+        self.__dates[event].append(( low, high, row, ))
+
+    def finish(self):
+        """ Sort the dates added and pack them in to arrays. """
+        for event, dates in self.__dates.items():
+            dates.sort()
+            self.lows[event]    = array.array('i', [ low for low, high, row in dates ])
+            self.highs[event]   = array.array('i', [ high for low, high, row in dates ])
+            self.rows[event]    = array.array('i', [ row for low, high, row in dates ])
+            self.widths[event]  = max([ high - low for low, high, row in dates ] or [ 0 ])
+        self.__dates    = None
+
+    def between(self, event, year1, year2):
+        """ Return the rows, in order, with an event date whose years are in year1 to year2 (both included) at all. """
+        if  event not in self.EVENTS:
+            raise ValueError("event must be one of: " + ", ".join(self.EVENTS))
+        lows    = self.lows[event]
+        highs   = self.highs[event]
+        rows    = self.rows[event]
+        start   = bisect.bisect_left(lows, year1 - self.widths[event])
+        end     = bisect.bisect_right(lows, year2)
+        return sorted(set(rows[i] for i in range(start, end) if highs[i] >= year1))
+
+    #   YearIndex
+
+
 if  False   :
     parse   = a_date.parse_death_date
     parse   = a_date.parse
@@ -1416,7 +4844,7 @@ if  __name__ == '__main__':
     pass
 
 
-__all__ = ["Gedcom", "Element", "GedcomParseError", ged_line_re, a_date, date_cache, ]
+__all__ = ["Gedcom", "Element", "ElementView", "ElementTable", "RecordIndex", "GedcomParseError", "ged_line_re", "a_date", "date_cache", "DateCache", "iter_records", "RecordParser", "RelationshipGraph", "Adjacency", "Closures", "PersonTable", "NameIndex", "SimilarNameIndex", "YearIndex", "compile_criteria", "soundex", "MonthMatcher", "add_month_names", "NO_DATE_KEY", "pack_dates", "unpack_dates", "date_key_fields", ]
 
 
 #
@@ -0,0 +1,221 @@
+#!/usr/bin/python
+
+#
+#       duplicates.py
+#
+#       Find people who are in a GEDCOM file more than once.
+#
+#       Distributed under GPL v2 like the rest of the package.
+#
+#       for score, person1, person2 in gedcom.find_duplicates(workers = 4) :
+#           print(score, person1.name(), person2.name())
+#
+
+from    __future__  import  print_function
+
+import  itertools
+import  multiprocessing
+
+from    gedcom      import  a_date, normal_name, soundex, str_ratio
+
+
+NAME_WEIGHT     = 3.0                   # given names and surname together
+DATE_WEIGHT     = 2.0                   # birth, and again death
+PARENTS_WEIGHT  = 2.0
+SEX_PENALTY     = 0.5                   # the score is multiplied by this if both sexes are known and aren't the same
+MAX_BLOCK       = 2000                  # blocks bigger than this are split by the given names' soundex codes, too
+
+
+def person_record(fields) :
+    """
+        Return what score_pair() looks at for a person, from fields that can be sent to another process:
+
+        fields:     ( row, given names, surname, gender(), birth DATE value, death DATE value, parent nodes, parent ( given names, surname, )s, )
+        returned:   ( row, given names, surname, surname soundex code, sex, birth ( year, month, day, ) or None, death ( ... ) or None, parent nodes, parent ( given names, surname, )s, )
+
+        Returned names are normal_name()s.
+
+    """
+    row, first, last, sex, birth, death, parent_nodes, parent_names = fields
+    dates       = []
+    for date in ( a_date.parse(birth), a_date.parse_death_date(death), ) :
+        dates.append(None if (not date) or (date.year is None) else ( date.year, date.month, date.day, ))
+    return ( row, normal_name(first), normal_name(last), soundex(last), sex.upper()[:1], dates[0], dates[1], tuple(parent_nodes), tuple(( normal_name(given), normal_name(surname), ) for given, surname in parent_names), )
+
+
+def _person_records(fields_list) :
+    """ Return the person_record() of each of a job's fields. """
+    return [ person_record(fields) for fields in fields_list ]
+
+
+def date_score(a, b) :
+    """ Return how alike two ( year, month, day, )s are, 0..1, or None if either isn't known. """
+    if  (a is None) or (b is None) :
+        return None
+    score   = max(0.0, 1.0 - abs(a[0] - b[0]) / 5.0)
+    if  score == 1.0 :
+        for x, y in ( ( a[1], b[1], ), ( a[2], b[2], ), ) :
+            if  x and y :
+                if  x != y :
+                    return 0.8
+                pass
+            else :
+                break                           # a date that says less, like just a year, isn't held against the other
+            pass
+        pass
+    return score
+
+
+def score_pair(a, b, ratios = None, min_score = 0.0) :
+    """
+        Return how likely it is that two person_record()s are the same person, 0..1.
+
+        ratios, if given, is a dict that keeps the str_ratio()s of names, which come up again and again.
+        Once the score can't get to min_score, something less than min_score is returned without finishing.
+
+    """
+    penalty = SEX_PENALTY if (a[4] and b[4] and (a[4] != b[4])) else 1.0
+    if  penalty < min_score :
+        return 0.0
+    total   = 0.0
+    weight  = 0.0
+    for i in ( 5, 6, ) :
+        score   = date_score(a[i], b[i])
+        if  score is not None :
+            total  += DATE_WEIGHT * score
+            weight += DATE_WEIGHT
+        pass
+    parents = bool(a[7] and b[7])
+    rest    = NAME_WEIGHT + (PARENTS_WEIGHT if parents else 0.0)
+    if  penalty * (total + rest) / (weight + rest) < min_score :
+        return 0.0
+    if  ratios is None :
+        ratios  = {}
+    def ratio(x, y) :
+        r   = ratios.get(( x, y, ))
+        if  r is None :
+            r   = ratios[( x, y, )] = str_ratio(x, y)
+        return r
+    total  += NAME_WEIGHT * (ratio(a[1], b[1]) + ratio(a[2], b[2])) / 2.0
+    weight += NAME_WEIGHT
+    if  parents :
+        if  penalty * (total + PARENTS_WEIGHT) / (weight + PARENTS_WEIGHT) < min_score :
+            return 0.0
+        if  set(a[7]).intersection(b[7]) :
+            score   = 1.0
+        else :
+            score   = max((ratio(x[0], y[0]) + ratio(x[1], y[1])) / 2.0 for x in a[8] for y in b[8]) if (a[8] and b[8]) else 0.0
+        total  += PARENTS_WEIGHT * score
+        weight += PARENTS_WEIGHT
+    return penalty * total / weight
+
+
+def blocks(records, max_block = MAX_BLOCK) :
+    """
+        Return ( people, neighbors, together, ) for each block of person_record()s: each of the people is compared with the
+        neighbors and, if together is True, with the rest of the people.
+
+        People are put in blocks by their surname's soundex code and their birth decade
+        (people without a birth year are in a block of their own for each code).
+        A block's neighbors are the people of the next decade, so 1849 and 1851 are compared.
+        The people without a birth year are compared with everyone with a birth year and the same code, too,
+        in a block of their own with together False.
+        Blocks of more than max_block people, neighbors included, are split by the soundex code of the given names.
+
+    """
+    by_key  = {}
+    dated   = {}                                # soundex code -> people with a birth year
+    for record in records :
+        decade  = None if record[5] is None else record[5][0] // 10
+        by_key.setdefault(( record[3], decade, ), []).append(record)
+        if  decade is not None :
+            dated.setdefault(record[3], []).append(record)
+        pass
+    results = []
+    for ( sound, decade, ), people in sorted(by_key.items(), key = lambda item : ( item[0][0], item[0][1] is None, item[0][1] or 0, )) :
+        if  decade is None :
+            results.extend(_split_block(people, [], True, max_block))
+            results.extend(_split_block(people, dated.get(sound, []), False, max_block))
+        else :
+            results.extend(_split_block(people, by_key.get(( sound, decade + 1, ), []), True, max_block))
+        pass
+    return [ ( people, neighbors, together, ) for people, neighbors, together in results if people and (neighbors or (together and (len(people) > 1))) ]
+
+
+def _split_block(people, neighbors, together, max_block) :
+    """ Return the block, or the blocks it's split in to by the given names' soundex codes if it has more than max_block people. """
+    if  len(people) + len(neighbors) <= max_block :
+        return [ ( people, neighbors, together, ) ]
+    split   = {}
+    for i, group in ( ( 0, people, ), ( 1, neighbors, ), ) :
+        for record in group :
+            split.setdefault(soundex(record[1]), ( [], [], ))[i].append(record)
+        pass
+    return [ ( people, neighbors, together, ) for people, neighbors in split.values() ]
+
+
+def _score_block(job) :
+    """ Return ( score, row, row, ) for each pair in a job's blocks that scores at least the job's min_score. """
+    block_list, min_score   = job
+    results = []
+    ratios  = {}
+    for people, neighbors, together in block_list :
+        for i, a in enumerate(people) :
+            for b in itertools.chain(itertools.islice(people, i + 1, None) if together else (), neighbors) :
+                score   = score_pair(a, b, ratios, min_score)
+                if  score >= min_score :
+                    results.append(( score, a[0], b[0], ) if a[0] < b[0] else ( score, b[0], a[0], ))
+                pass
+            pass
+        pass
+    return results
+
+
+def find_duplicates(people, workers = None, min_score = 0.75, max_block = MAX_BLOCK) :
+    """
+        Return ( score, row, row, ) for each pair of people, given as person_record() fields, that score_pair() gives at least min_score, best first.
+
+        Only people in the same blocks() are compared. With workers, the person_record()s are
+        made, and the blocks are scored, in a pool of that many processes.
+
+    """
+    pool    = None
+    if  workers and (workers > 1) and people :
+        pool    = multiprocessing.Pool(workers)
+    try :
+        if  pool is None :
+            records = _person_records(people)
+        else :
+            size    = -(-len(people) // (workers * 4))
+            records = [ record for done in pool.imap(_person_records, [ people[i : i + size] for i in range(0, len(people), size) ]) for record in done ]
+        block_list  = blocks(records, max_block)
+        jobs        = []
+        job         = []
+        pairs       = 0
+        for block_people, neighbors, together in block_list :
+            job.append(( block_people, neighbors, together, ))
+            pairs  += (len(block_people) * (len(block_people) - 1) // 2 if together else 0) + len(block_people) * len(neighbors)
+            if  pairs >= 20000 :
+                jobs.append(( job, min_score, ))
+                job     = []
+                pairs   = 0
+            pass
+        if  job :
+            jobs.append(( job, min_score, ))
+        if  (pool is not None) and (len(jobs) > 1) :
+            done    = list(pool.imap_unordered(_score_block, jobs))
+        else :
+            done    = [ _score_block(job) for job in jobs ]
+        pass
+    finally :
+        if  pool is not None :
+            pool.terminate()
+            pool.join()
+        pass
+    results = [ result for found in done for result in found ]
+    results.sort(key = lambda result : ( -result[0], result[1], result[2], ))
+    return results
+
+
+#
+# eof
@@ -0,0 +1,371 @@
+#!/usr/bin/python
+
+#
+#       kinship.py
+#
+#       Kinship, inbreeding and relationship coefficients of the people in a GEDCOM file.
+#
+#       Distributed under GPL v2 like the rest of the package.
+#
+#       Uses numpy if it's installed. Everything works without it.
+#
+#       graph       = gedcom.relationship_graph()
+#       pedigree    = Pedigree(graph, natural = True)           # natural parents only, as get_parents(indi, "NAT")
+#       f           = inbreeding(pedigree)                      # f['@I1@'] is the inbreeding coefficient of @I1@
+#       r           = relatedness(pedigree, [ ( '@I1@', '@I2@', ), ... ])   # r['@I1@', '@I2@']
+#
+
+from    __future__  import  print_function
+
+import  array
+import  collections
+import  heapq
+
+try :
+    from collections.abc import Mapping
+except ImportError :
+    from collections import Mapping                     # python2
+
+try :
+    import  numpy
+except ImportError :
+    numpy   = None
+
+
+class   XrefArray(Mapping) :
+    """ Numbers by xref (pointer), or by (xref, xref) pair, kept in one array, .array: a numpy array if numpy is installed, an array('d') if not. """
+
+    def __init__(self, xrefs, values) :
+        self.xrefs      = xrefs
+        self.array      = values
+        self.__index    = dict((xref, i) for i, xref in enumerate(xrefs))
+
+
+    def __getitem__(self, xref) :
+        return float(self.array[self.__index[xref]])
+
+
+    def __contains__(self, xref) :
+        return xref in self.__index
+
+
+    def __iter__(self) :
+        return iter(self.xrefs)
+
+
+    def __len__(self) :
+        return len(self.xrefs)
+
+    pass
+#   XrefArray
+
+
+class   Pedigree(object) :
+    """
+        The individuals of a RelationshipGraph in topological order (everyone after their parents), each with at most one sire and one dam.
+
+        nodes[i]            - the graph node of individual number i
+        positions[node]     - the individual number of a graph node
+        sires[i], dams[i]   - the individual numbers of the father and mother of individual number i, or -1 if not known
+        generations[i]      - 0 for someone with no known parents, else one more than their parents' greatest generation
+
+        The sire is the first HUSB, and the dam the first WIFE, of the
+        person's FAMC families who is one of the person's parents (natural
+        parents, with natural=True). If the file has someone as their own
+        ancestor, the parent link that closes the loop is left out.
+
+    """
+
+    def __init__(self, graph, natural = False) :
+        self.graph      = graph
+        self.natural    = natural
+        individuals     = graph.individuals()
+        is_individual   = set(individuals)
+        parents         = graph.natural_parents if natural else graph.parents
+        sire_of         = {}
+        dam_of          = {}
+        for node in individuals :
+            node_parents    = set(parents[node])
+            for fam in graph.famc[node] :
+                if  node not in sire_of :
+                    for husb in graph.family_members(fam, ( graph.HUSB, )) :
+                        if  husb in node_parents and husb in is_individual and husb != node :
+                            sire_of[node]   = husb
+                            break
+                        pass
+                    pass
+                if  node not in dam_of :
+                    for wife in graph.family_members(fam, ( graph.WIFE, )) :
+                        if  wife in node_parents and wife in is_individual and wife != node and wife != sire_of.get(node) :
+                            dam_of[node]    = wife
+                            break
+                        pass
+                    pass
+                pass
+            pass
+
+        # Kahn's topological sort. Loops are broken at the lowest numbered node left.
+        children        = dict((node, []) for node in individuals)
+        waiting         = dict((node, 0) for node in individuals)       # how many of the node's parents aren't placed yet
+        for node in individuals :
+            for parent in ( sire_of.get(node), dam_of.get(node), ) :
+                if  parent is not None :
+                    children[parent].append(node)
+                    waiting[node]  += 1
+                pass
+            pass
+        order           = []
+        placed          = set()
+        ready           = [ node for node in individuals if not waiting[node] ]
+        heapq.heapify(ready)
+        left            = iter(individuals)
+        while len(order) < len(individuals) :
+            if  not ready :
+                for node in left :
+                    if  node not in placed :
+                        break
+                    pass
+                for parents_of in ( sire_of, dam_of, ) :
+                    if  parents_of.get(node) is not None and parents_of[node] not in placed :
+                        children[parents_of[node]].remove(node)
+                        del parents_of[node]
+                    pass
+                ready   = [ node ]
+            node    = heapq.heappop(ready)
+            order.append(node)
+            placed.add(node)
+            for child in children[node] :
+                waiting[child] -= 1
+                if  not waiting[child] :
+                    heapq.heappush(ready, child)
+                pass
+            pass
+
+        self.nodes          = order
+        self.positions      = dict((node, i) for i, node in enumerate(order))
+        self.sires          = array.array('i', [ self.positions.get(sire_of.get(node), -1) for node in order ])
+        self.dams           = array.array('i', [ self.positions.get(dam_of.get(node), -1) for node in order ])
+        self.generations    = array.array('i', [ 0 ]) * len(order)
+        for i in range(len(order)) :
+            self.generations[i] = max(self.generations[self.sires[i]] + 1 if self.sires[i] >= 0 else 0, self.generations[self.dams[i]] + 1 if self.dams[i] >= 0 else 0)
+        pass
+
+
+    def __len__(self) :
+        return len(self.nodes)
+
+
+    def xrefs(self, positions = None) :
+        """ Return the pointers of the given individual numbers (all of them, by default). """
+        pointers    = self.graph.pointers
+        nodes       = self.nodes
+        return [ pointers[nodes[i]] for i in (range(len(nodes)) if positions is None else positions) ]
+
+
+    def position(self, xref) :
+        """ Return the individual number of a pointer. """
+        return self.positions[self.graph.ids[xref]]
+
+
+    def ancestors(self, positions) :
+        """ Return the given individual numbers and all their ancestors' numbers, in order. """
+        found   = set()
+        stack   = list(positions)
+        while stack :
+            i   = stack.pop()
+            if  i >= 0 and i not in found :
+                found.add(i)
+                stack.append(self.sires[i])
+                stack.append(self.dams[i])
+            pass
+        return sorted(found)
+
+    pass
+#   Pedigree
+
+
+BLOCK_SIZE  = 1024          # how many people's rows of path coefficients kinship() and the like keep at a time
+
+
+def _sampling(pedigree, numbers) :
+    """
+        Return ( f, d ): the inbreeding coefficients and Mendelian sampling variances of the given individual numbers, array('d')s by individual number.
+
+        numbers must be in order and take in all their ancestors (see Pedigree.ancestors()). The others are left 0.
+
+        This is Meuwissen and Luo's method (1992), which goes up each person's
+        ancestors once, with path_coefficients(), without a kinship matrix, so
+        memory is only a few numbers a person. Full siblings reuse the first
+        sibling's answer.
+
+    """
+    n       = len(pedigree)
+    sires   = pedigree.sires
+    dams    = pedigree.dams
+    f       = array.array('d', [ 0.0 ]) * n
+    d       = array.array('d', [ 0.0 ]) * n
+    last    = {}                                    # ( sire, dam ) -> the last person with those parents
+    for i in numbers :
+        s, m    = sires[i], dams[i]
+        if  s >= 0 and m >= 0 :
+            d[i]    = 0.5 - 0.25 * (f[s] + f[m])
+        elif s >= 0 or m >= 0 :
+            d[i]    = 0.75 - 0.25 * f[max(s, m)]
+        else :
+            d[i]    = 1.0
+        if  s < 0 or m < 0 :
+            continue                                # f[i] is 0
+        if  ( s, m, ) in last :
+            f[i]    = f[last[( s, m, )]]
+            last[( s, m, )] = i
+            continue
+        last[( s, m, )] = i
+        f[i]    = sum([ lj * lj * d[j] for j, lj in path_coefficients(pedigree, i).items() ]) - 1.0
+    return f, d
+
+
+def path_coefficients(pedigree, i) :
+    """
+        Return { individual number : path coefficient } of individual number i and all of i's ancestors: i's row of L, where 2 * kinship = L D L'.
+
+        Each coefficient is the sum, over the paths up from i to the ancestor, of 1/2 for each generation.
+
+    """
+    sires   = pedigree.sires
+    dams    = pedigree.dams
+    path    = { i : 1.0 }                           # ancestor -> its path coefficient, so far
+    heap    = [ -i ]
+    row     = {}
+    while heap :
+        j       = -heapq.heappop(heap)              # the youngest first, so all of j's path coefficient is in
+        lj      = row[j]    = path.pop(j)
+        for parent in ( sires[j], dams[j], ) :
+            if  parent >= 0 :
+                if  parent not in path :
+                    path[parent]    = 0.0
+                    heapq.heappush(heap, -parent)
+                path[parent]   += 0.5 * lj
+            pass
+        pass
+    return row
+
+
+def inbreeding(pedigree) :
+    """ Return the XrefArray of everyone's inbreeding coefficient: the kinship of their sire and dam (see _sampling()). """
+    f, d    = _sampling(pedigree, range(len(pedigree)))
+    return XrefArray(pedigree.xrefs(), numpy.array(f) if numpy is not None else f)
+
+
+class   _Kinships(object) :
+    """
+        Kinship coefficients of pairs of people, from their path_coefficients(): kinship(a, b) = 1/2 * the sum over their common ancestors j (and themselves) of L[a][j] * L[b][j] * d[j].
+
+        The rows of L of at most block_size people are kept, the least recently used are dropped,
+        so memory is bounded by the block size and how many ancestors people have, not by the square of anything.
+
+    """
+
+    def __init__(self, pedigree, positions, block_size = BLOCK_SIZE) :
+        self.pedigree   = pedigree
+        self.f, self.d  = _sampling(pedigree, pedigree.ancestors(positions))
+        self.block_size = max(2, block_size)
+        self.__rows     = collections.OrderedDict()
+
+
+    def row(self, i) :
+        rows    = self.__rows
+        found   = rows.pop(i, None)
+        if  found is None :
+            found   = path_coefficients(self.pedigree, i)
+            while len(rows) >= self.block_size :
+                rows.popitem(last = False)
+            pass
+        rows[i] = found
+        return found
+
+
+    def kinship(self, a, b) :
+        row_a   = self.row(a)
+        row_b   = self.row(b)
+        if  len(row_b) < len(row_a) :
+            row_a, row_b    = row_b, row_a
+        d       = self.d
+        total   = 0.0
+        for j, lj in row_a.items() :
+            other   = row_b.get(j)
+            if  other is not None :
+                total  += lj * other * d[j]
+            pass
+        return 0.5 * total
+
+    pass
+#   _Kinships
+
+
+def _pair_positions(pedigree, pairs) :
+    """ Return the different (xref, xref) pairs, in order, and their ( individual number, individual number, )s. """
+    pairs   = list(collections.OrderedDict.fromkeys(( a, b, ) for a, b in pairs))
+    return pairs, [ ( pedigree.position(a), pedigree.position(b), ) for a, b in pairs ]
+
+
+def _pair_values(pairs, positions, value) :
+    """ Return the XrefArray of value(a, b) for the pairs, worked out in order of the individual numbers, so each person's row is used while it's kept. """
+    values  = array.array('d', [ 0.0 ]) * len(pairs)
+    for k in sorted(range(len(pairs)), key = lambda k : positions[k]) :
+        values[k]   = value(*positions[k])
+    return XrefArray(pairs, numpy.array(values) if numpy is not None else values)
+
+
+def kinship_matrix(pedigree, positions, block_size = BLOCK_SIZE) :
+    """
+        Return the kinship coefficients of the given individual numbers with each other, in their order:
+        a numpy array if numpy is installed, a list of array('d') rows if not.
+
+        The matrix is only as big as the number of people asked about, squared. It's
+        worked out block_size rows at a time, with the rows of L of just those people
+        kept, and those of the columns' people worked out again for each block.
+
+    """
+    positions   = list(positions)
+    m           = len(positions)
+    kinships    = _Kinships(pedigree, positions, block_size + 1)
+    k           = numpy.zeros(( m, m, )) if numpy is not None else [ array.array('d', [ 0.0 ]) * m for i in range(m) ]
+    for start in range(0, m, block_size) :
+        block   = range(start, min(m, start + block_size))
+        for x in block :
+            kinships.row(positions[x])
+        for y in range(start, m) :
+            for x in block :
+                if  x <= y :
+                    k[x][y] = k[y][x]   = kinships.kinship(positions[x], positions[y])
+                pass
+            pass
+        pass
+    return k
+
+
+def kinship(pedigree, pairs, block_size = BLOCK_SIZE) :
+    """
+        Return the XrefArray of the kinship coefficients of the different (xref, xref) pairs, keyed by the pairs.
+
+        .array holds them in the order of the pairs. At most block_size people's
+        path coefficients are kept at a time (see _Kinships).
+
+    """
+    pairs, positions    = _pair_positions(pedigree, pairs)
+    kinships            = _Kinships(pedigree, set(p for pair in positions for p in pair), block_size)
+    return _pair_values(pairs, positions, kinships.kinship)
+
+
+def relatedness(pedigree, pairs, block_size = BLOCK_SIZE) :
+    """ Return the XrefArray of the coefficients of relationship of the different (xref, xref) pairs, keyed by the pairs: 2 * kinship / sqrt((1 + F(a)) * (1 + F(b))). """
+    pairs, positions    = _pair_positions(pedigree, pairs)
+    kinships            = _Kinships(pedigree, set(p for pair in positions for p in pair), block_size)
+    f                   = kinships.f
+    def related(a, b) :
+        return 2.0 * kinships.kinship(a, b) / ((1.0 + f[a]) * (1.0 + f[b])) ** 0.5
+    return _pair_values(pairs, positions, related)
+
+
+#
+# eof
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+
+#
+#       relationship.py
+#
+#       How two people in a GEDCOM file are related, worked out over a RelationshipGraph.
+#
+#       Distributed under GPL v2 like the rest of the package.
+#
+
+from    __future__  import  print_function
+
+from    gedcom      import  Adjacency, Closures
+
+
+ORDINALS    = [ "", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth", ]
+
+
+def nth(n):
+    """ Return "1st", "2nd", "3rd", "4th" ... "11th", "12th" ... "21st" ... for n. """
+    if  10 <= n % 100 <= 20:
+        return "%dth" % n
+    return "%d%s" % ( n, { 1: "st", 2: "nd", 3: "rd", }.get(n % 10, "th"), )
+
+
+def ordinal(n):
+    """ Return "first", "second" ... "tenth", then "11th", "12th" ... for n. """
+    if  n < len(ORDINALS):
+        return ORDINALS[n]
+    return nth(n)
+
+
+def greats(n, name):
+    """ Return name with n "great-"s in front of it: "great-grandparent", "2nd great-grandparent" ... """
+    if  n <= 0:
+        return name
+    if  n == 1:
+        return "great-" + name
+    return "%s great-%s" % ( nth(n), name, )
+
+
+def relationship_label(up, down):
+    """
+        Return what someone is to a person, given that their nearest common ancestor is
+        up generations above the person and down generations above the someone.
+
+        up and down of (1, 1) is "sibling", (2, 3) is "first cousin once removed", and so on.
+
+    """
+    if  up == 0 and down == 0:
+        return "self"
+    if  up == 0:
+        return greats(down - 2, "grandchild") if down > 1 else "child"
+    if  down == 0:
+        return greats(up - 2, "grandparent") if up > 1 else "parent"
+    if  up == 1 and down == 1:
+        return "sibling"
+    if  up == 1:
+        return greats(down - 3, "grandniece/nephew") if down > 2 else "niece/nephew"
+    if  down == 1:
+        return greats(up - 2, "aunt/uncle")
+    removed = abs(up - down)
+    label   = "%s cousin" % ordinal(min(up, down) - 1)
+    if  removed == 1:
+        label  += " once removed"
+    elif removed == 2:
+        label  += " twice removed"
+    elif removed:
+        label  += " %d times removed" % removed
+    return label
+
+
+class   Relationship(object) :
+    """
+        How b is related to a.
+
+        a, b                - the nodes asked about (elements, from Gedcom.relationship())
+        common_ancestors    - the lowest common ancestors: common ancestors none of whose children are common ancestors, nearest first
+        up, down            - generations from a, and from b, up to the nearest of them. None if there isn't one.
+        label               - what b is to a: "parent", "sibling", "second cousin twice removed", ... or "" if they aren't related by blood
+
+    """
+
+    __slots__   = ( 'a', 'b', 'common_ancestors', 'up', 'down', 'label', )
+
+    def __init__(self, a, b, common_ancestors, up, down) :
+        self.a                  = a
+        self.b                  = b
+        self.common_ancestors   = common_ancestors
+        self.up                 = up
+        self.down               = down
+        self.label              = "" if up is None else relationship_label(up, down)
+
+
+    def related(self) :
+        """ Return whether a and b have a common ancestor (or one is the other's ancestor). """
+        return self.up is not None
+
+
+    def __str__(self) :
+        return self.label or "not related"
+
+
+    def __repr__(self) :
+        return "Relationship(%r, %r, %r)" % ( self.a, self.b, self.label, )
+
+    pass
+#   Relationship
+
+
+class   RelationshipCalculator(object) :
+    """
+        Answer how people are related, over the node ids of a RelationshipGraph.
+
+        natural     - follow only natural parents (see Closures)
+        spouses     - let shortest_path() go through marriages, too
+
+        relationship() goes up from both people breadth first to find their
+        lowest common ancestors. relationships() answers a batch of pairs and
+        goes up from each person in the batch only once.
+
+    """
+
+    def __init__(self, graph, natural = False, spouses = False) :
+        self.graph      = graph
+        self.closures   = Closures(graph, natural = natural, memoize = False)
+        self.parents    = self.closures.parents
+        self.children   = self.parents.inverse()        # so going down undoes going up exactly
+        self.spouses    = None
+        if  spouses :
+            inverse         = graph.spouses.inverse()   # someone can be a spouse in a family that isn't one of their FAMS families
+            self.spouses    = Adjacency([ sorted(set(graph.spouses[node]) | set(inverse[node])) for node in range(len(graph)) ])
+        pass
+
+
+    def neighbors(self, node) :
+        """ Return the nodes one step from the node: its parents and children (and spouses). """
+        neighbors   = list(self.parents[node]) + list(self.children[node])
+        if  self.spouses is not None :
+            neighbors.extend(self.spouses[node])
+        return neighbors
+
+
+    def shortest_path(self, a, b) :
+        """ Return the nodes of a shortest path from a to b over parent and child (and spouse) links, or None if there's no path. """
+        if  a == b :
+            return [ a ]
+        came_from   = ( { a : None }, { b : None }, )       # how each side reached each node
+        distances   = ( { a : 0 }, { b : 0 }, )
+        frontiers   = [ [ a ], [ b ], ]
+        while frontiers[0] and frontiers[1] :
+            side    = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1      # grow the smaller side
+            mine    = came_from[side]
+            other   = distances[1 - side]
+            frontier    = []
+            best        = None                              # ( length, node the sides meet at )
+            for node in frontiers[side] :
+                distance    = distances[side][node] + 1
+                for n in self.neighbors(node) :
+                    if  n in mine :
+                        continue
+                    mine[n]             = node
+                    distances[side][n]  = distance
+                    if  n in other :
+                        if  (best is None) or (distance + other[n] < best[0]) :
+                            best    = ( distance + other[n], n, )
+                        pass
+                    frontier.append(n)
+                pass
+            if  best is not None :
+                return self.__join(came_from, best[1])      # the shortest meeting this side's whole next generation makes
+            frontiers[side] = frontier
+        return None
+
+
+    @staticmethod
+    def __join(came_from, middle) :
+        path    = []
+        node    = middle
+        while node is not None :
+            path.append(node)
+            node    = came_from[0][node]
+        path.reverse()
+        node    = came_from[1][middle]
+        while node is not None :
+            path.append(node)
+            node    = came_from[1][node]
+        return path
+
+
+    def ancestor_generations(self, node) :
+        """ Return { ancestor node : generations up } for the node, with the node itself at 0. """
+        generations         = dict(self.closures.generations(node))
+        generations[node]   = 0
+        return generations
+
+
+    def relationship(self, a, b) :
+        """ Return the Relationship of b to a. """
+        return self.__relationship(a, b, self.ancestor_generations(a), self.ancestor_generations(b))
+
+
+    def relationships(self, pairs) :
+        """ Return the Relationship of b to a for each (a, b) in pairs, going up from each person only once. """
+        generations = {}
+        results     = []
+        for a, b in pairs :
+            for node in ( a, b, ) :
+                if  node not in generations :
+                    generations[node]   = self.ancestor_generations(node)
+                pass
+            results.append(self.__relationship(a, b, generations[a], generations[b]))
+        return results
+
+
+    def __relationship(self, a, b, a_generations, b_generations) :
+        if  len(b_generations) < len(a_generations) :
+            common  = [ node for node in b_generations if node in a_generations ]
+        else :
+            common  = [ node for node in a_generations if node in b_generations ]
+        if  not common :
+            return Relationship(a, b, [], None, None)
+        common_set  = set(common)
+        children    = self.children
+        lowest      = [ node for node in common if not any(child in common_set for child in children[node]) ]
+        lowest.sort(key = lambda node : ( a_generations[node] + b_generations[node], a_generations[node], node, ))
+        nearest     = lowest[0]
+        return Relationship(a, b, lowest, a_generations[nearest], b_generations[nearest])
+
+    pass
+#   RelationshipCalculator
+
+
+#
+# eof